@@ -0,0 +1,64 @@
+"""Benchmark for creating cases, comparing the old sequence (read the guild, increment the case ID,
+make sure the user has a Cases document, push the case) with Settings.create_case, which reserves
+the ID with one find_one_and_update and inserts the case as its own CaseRecord document.
+
+Needs a MongoDB server running locally. Everything is written to a separate `botty_bench` database,
+which is dropped at the end.
+
+Run from the root of the project with `python -m benchmarks.case_creation`
+"""
+
+import time
+
+import mongoengine
+from data.case import Case
+from data.caserecord import CaseRecord
+from data.cases import Cases
+from data.guild import Guild
+from pymongo import ReturnDocument
+
+GUILD_ID = 1
+N = 500
+
+
+def old_create_case(user_id):
+    guild = Guild.objects(_id=GUILD_ID).first()
+    case = Case(_id=guild.case_id, _type="WARN", mod_id=0, mod_tag="bench#0000", reason="bench", punishment="50")
+    Guild.objects(_id=GUILD_ID).update_one(inc__case_id=1)
+    if not Cases.objects(_id=user_id):
+        Cases(_id=user_id).save()
+    Cases.objects(_id=user_id).update_one(push__cases=case)
+    return case
+
+
+def new_create_case(user_id):
+    g = Guild._get_collection().find_one_and_update({'_id': GUILD_ID}, {'$inc': {'case_id': 1}},
+                                                    projection={'case_id': 1},
+                                                    return_document=ReturnDocument.BEFORE)
+    case = Case(_id=g['case_id'], _type="WARN", mod_id=0, mod_tag="bench#0000", reason="bench", punishment="50")
+    CaseRecord.from_case(user_id, case).save()
+    return case
+
+
+def bench(name, func):
+    Guild.drop_collection()
+    Cases.drop_collection()
+    CaseRecord.drop_collection()
+    Guild(_id=GUILD_ID, case_id=1).save()
+
+    start = time.perf_counter()
+    for i in range(N):
+        # half of the cases go to users who already have some
+        func(i % (N // 2))
+    elapsed = time.perf_counter() - start
+
+    ids = [case._id for cases in Cases.objects for case in cases.cases] + [r.case_id for r in CaseRecord.objects]
+    assert len(ids) == len(set(ids)) == N
+    print(f"{name:<28} {elapsed / N * 1e3:8.3f} ms/case")
+
+
+if __name__ == "__main__":
+    mongoengine.register_connection(alias="core", name="botty_bench")
+    bench("old sequence", old_create_case)
+    bench("create_case", new_create_case)
+    mongoengine.connection.get_connection("core").drop_database("botty_bench")
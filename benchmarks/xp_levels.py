@@ -0,0 +1,52 @@
+"""Micro-benchmark for the XP level curve, comparing the old loops with the table lookups
+in cogs/utils/levels.py.
+
+Run from the root of the project with `python -m benchmarks.xp_levels`
+"""
+
+import random
+import timeit
+from math import floor
+
+from cogs.utils.levels import level_for_xp, xp_for_level
+
+
+def old_get_level(current_xp):
+    level = 0
+    xp = 0
+    while xp <= current_xp:
+        xp = xp + 45 * level * (floor(level / 10) + 1)
+        level += 1
+    return level
+
+
+def old_xp_for_next_level(next):
+    level = 0
+    xp = 0
+    for _ in range(0, next):
+        xp = xp + 45 * level * (floor(level / 10) + 1)
+        level += 1
+    return xp
+
+
+def bench(name, func, inputs, number=20):
+    total = timeit.timeit(lambda: [func(x) for x in inputs], number=number)
+    per_call = total / (number * len(inputs)) * 1e6
+    print(f"{name:<28} {per_call:8.3f} us/call")
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    # XP of an active user is somewhere in the first 100 levels
+    xps = [random.randint(0, xp_for_level(100)) for _ in range(1000)]
+    levels = [random.randint(0, 100) for _ in range(1000)]
+
+    assert [old_get_level(x) for x in xps] == [level_for_xp(x) for x in xps]
+    assert [old_xp_for_next_level(n) for n in levels] == [xp_for_level(n) for n in levels]
+
+    print("xp -> level (once per message)")
+    bench("loop", old_get_level, xps)
+    bench("bisect", level_for_xp, xps)
+    print("level -> xp (once per !xp)")
+    bench("loop", old_xp_for_next_level, levels)
+    bench("table", xp_for_level, levels)
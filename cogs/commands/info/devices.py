@@ -1,18 +1,16 @@
-import json
 import re
 import traceback
 
-import aiohttp
 import asyncio
 import discord
+from cogs.utils.devices import DeviceCatalog
 from discord.ext import commands
 
 
 class Devices(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.devices_url = "https://api.ipsw.me/v4/devices"
-        self.firmwares_url = "https://api.ipsw.me/v4/device/"
+        self.catalog = DeviceCatalog(bot.settings.http)
         self.devices_test = re.compile(r'^.+ \[.+\,.+\]$')
         self.possible_devices = ['iphone', 'ipod', 'ipad', 'homepod', 'apple']
 
@@ -44,29 +42,8 @@ class Devices(commands.Cog):
             raise commands.BadArgument(
                 "Unsupported device. Please see `!listdevices` for possible devices.")
 
-        the_device = None
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(self.devices_url) as resp:
-                if resp.status == 200:
-                    data = await resp.text()
-                    devices = json.loads(data)
-                    devices.append(
-                        {'name': 'iPhone SE 2', 'identifier': 'iPhone12,8'})
-
-                    # try to find a device with the name given in command
-                    for d in devices:
-                        # remove regional version info of device i.e iPhone SE (CDMA) -> iPhone SE
-                        name = re.sub(r'\((.*?)\)', "", d["name"])
-                        # get rid of '[ and ']'
-                        name = name.replace('[', '')
-                        name = name.replace(']', '')
-                        name = name.strip()
-
-                        # are the names equal?
-                        if name.lower() == device.lower():
-                            d["name"] = name
-                            the_device = d
+        # try to find a device with the name given in command
+        the_device = await self.catalog.find(device)
 
         # did we find a device with given name?
         if not the_device:
@@ -82,14 +59,10 @@ class Devices(commands.Cog):
         def check(m):
             return m.author == ctx.author and m.channel == ctx.channel
 
-        firmwares = None
         # retrieve list of available firmwares for the given device
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{self.firmwares_url}/{the_device['identifier']}") as resp:
-                if resp.status == 200:
-                    firmwares = json.loads(await resp.text())["firmwares"]
+        firmwares = await self.catalog.firmwares(the_device['identifier'])
 
-        if len(firmwares) == 0:
+        if not firmwares:
             raise commands.BadArgument("Unforunately I don't have version history for this device.")
 
         found = False
@@ -177,46 +150,20 @@ class Devices(commands.Cog):
 
         await self.check_permissions(ctx)
 
-        devices_dict = {
-            'iPhone': set(),
-            'iPod': set(),
-            'iPad': set(),
-            'Apple TV': set(),
-            'Apple Watch': set(),
-            'HomePod': set(),
-        }
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(self.devices_url) as resp:
-                if resp.status == 200:
-                    data = await resp.text()
-                    devices = json.loads(data)
-                    for d in devices:
-                        name = re.sub(r'\((.*?)\)', "", d["name"])
-                        name = name.replace('[', '')
-                        name = name.replace(']', '')
-                        name = name.strip()
-                        for key in devices_dict.keys():
-                            if key in name:
-                                devices_dict[key].add(name)
-
-        # stupid ipsw.me api doesn't have these devices
-        devices_dict["iPhone"].add("iPhone SE 2")
-        # devices_dict["Apple Watch"].add("Apple Watch Series 6")
-        # devices_dict["Apple Watch"].add("Apple Watch SE")
+        await self.catalog.ensure_loaded()
 
         embed = discord.Embed(title="Devices list")
         embed.color = discord.Color.blurple()
-        for key in devices_dict.keys():
-            temp = list(devices_dict[key])
-            temp.sort()
-            embed.add_field(name=key, value=', '.join(
-                map(str, temp)), inline=False)
+        for key, names in self.catalog.families.items():
+            embed.add_field(name=key, value=', '.join(names), inline=False)
 
         embed.set_footer(text=f"Requested by {ctx.author}")
 
         await ctx.message.reply(embed=embed)
 
+    def cog_unload(self):
+        self.catalog.stop()
+
     async def check_permissions(self, ctx: commands.Context):
         # non-mods can only use this in #bot-commands
         bot_chan = self.bot.settings.guild().channel_botspam
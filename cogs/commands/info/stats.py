@@ -97,6 +97,8 @@ class Stats(commands.Cog):
         embed.add_field(name="Memory Usage",
                         value=f"{floor(process.memory_info().rss/1000/1000)} MB")
         embed.add_field(name="Python Version", value=platform.python_version())
+        embed.add_field(name="Reaction listeners", value=self.bot.settings.reactions.active)
+        embed.add_field(name="HTTP requests", value=self.bot.settings.http.requests)
 
         await ctx.message.reply(embed=embed)
 
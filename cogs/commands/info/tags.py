@@ -91,7 +91,7 @@ class Tags(commands.Cog):
             raise commands.BadArgument(
                 f"Command only allowed in <#{bot_chan}>")
 
-        tags = sorted(self.bot.settings.guild().tags, key=lambda tag: tag.name)
+        tags = await self.bot.settings.all_tags()
 
         if len(tags) == 0:
             raise commands.BadArgument("There are no tags defined.")
@@ -153,11 +153,46 @@ class Tags(commands.Cog):
         
         if tag is None:
             await ctx.message.delete()
+            suggestions = await self.bot.settings.suggest_tags(name)
+            if suggestions:
+                raise commands.BadArgument(
+                    "That tag does not exist. Did you mean " + ", ".join(f"`{s}`" for s in suggestions) + "?")
             raise commands.BadArgument("That tag does not exist.")
         
         await ctx.message.reply(embed=await self.tag_embed(tag), mention_author=False)
 
+    @commands.guild_only()
+    @commands.command(name="tagsearch", aliases=['tsearch'])
+    async def tagsearch(self, ctx, name: str):
+        """Search for tags by name.
+
+        Example usage
+        -------------
+        !tagsearch robl
+
+        Parameters
+        ----------
+        name : str
+            Start of, or something close to, the name of the tag
+        """
+
+        bot_chan = self.bot.settings.guild().channel_botspam
+        if not self.bot.settings.permissions.hasAtLeast(ctx.guild, ctx.author, 4) and ctx.channel.id != bot_chan:
+            raise commands.BadArgument(
+                f"Command only allowed in <#{bot_chan}>")
+
+        tags = await self.bot.settings.search_tags(name.lower(), limit=12)
+        if len(tags) == 0:
+            raise commands.BadArgument("No tags found.")
+
+        embed = discord.Embed(
+            title=f'Tags matching "{discord.utils.escape_markdown(name)}"', color=discord.Color.blurple())
+        for tag in tags:
+            embed.add_field(name=tag.name, value=f"Added by: {tag.added_by_tag}\nUsed {tag.use_count} times")
+        await ctx.message.reply(embed=embed, mention_author=False)
+
     @tag.error
+    @tagsearch.error
     @taglist.error
     @deltag.error
     @addtag.error
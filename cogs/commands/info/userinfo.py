@@ -1,8 +1,8 @@
 import traceback
 import typing
-from math import floor
 
 import discord
+from cogs.utils.levels import level_for_xp, xp_for_level
 from discord.ext import commands, menus
 
 
@@ -10,15 +10,17 @@ class LeaderboardSource(menus.GroupByPageSource):
     async def format_page(self, menu, entry):
         embed = discord.Embed(
             title=f'Leaderboard', color=discord.Color.blurple())
+        # look up everyone on this page who isn't in the guild anymore at once, instead of one at a time
+        to_fetch = [user._id for i, user in entry.items if i == 0 or menu.ctx.guild.get_member(user._id) is None]
+        fetched = await menu.ctx.bot.settings.users.fetch_many(to_fetch)
+
         for i, user in entry.items:
             trophy = ''
             if i == 0:
                 trophy = ':first_place:'
-                try:
-                    obj = await menu.ctx.bot.fetch_user(user._id)
+                obj = fetched.get(user._id)
+                if obj is not None:
                     embed.set_thumbnail(url=obj.avatar_url)
-                except discord.NotFound:
-                    pass
 
             if i == 1:
                 trophy = ':second_place:'
@@ -28,18 +30,10 @@ class LeaderboardSource(menus.GroupByPageSource):
             member = None
             member_found = menu.ctx.guild.get_member(user._id) is not None
             if not member_found:
-                if user._id not in menu.ctx.user_cache:
-                    try:
-                        member = await menu.ctx.bot.fetch_user(user._id)
-                        menu.ctx.user_cache[user._id] = member
-                    except Exception:
-                        member = None
-
-                else:
-                    member = menu.ctx.user_cache[user._id]
+                member = fetched.get(user._id)
 
             member_string = f'{f"({str(member)})" if member is not None else ""}'
-            embed.add_field(name=f"#{i+1} - Level {user.level}",
+            embed.add_field(name=f"#{i+1} - Level {level_for_xp(user.xp)}",
                             value=f"{trophy} <@{user._id}> {member_string}", inline=False)
             
         embed.set_footer(
@@ -47,8 +41,26 @@ class LeaderboardSource(menus.GroupByPageSource):
         return embed
 
 
-class CasesSource(menus.GroupByPageSource):
-    async def format_page(self, menu, entry):
+class CasesSource(menus.PageSource):
+    """Pages through a user's cases, reading only the page that is displayed from the database
+    """
+
+    def __init__(self, settings, user_id: int, count: int, per_page: int = 9):
+        self.settings = settings
+        self.user_id = user_id
+        self.count = count
+        self.per_page = per_page
+
+    def is_paginating(self):
+        return self.count > self.per_page
+
+    def get_max_pages(self):
+        return max(1, -(-self.count // self.per_page))
+
+    async def get_page(self, page_number):
+        return await self.settings.cases(self.user_id, skip=page_number * self.per_page, limit=self.per_page)
+
+    async def format_page(self, menu, entries):
         pun_map = {
             "KICK": "Kicked",
             "BAN": "Banned",
@@ -63,7 +75,7 @@ class CasesSource(menus.GroupByPageSource):
         embed = discord.Embed(
             title=f'Cases - {u.warn_points} warn points', color=discord.Color.blurple())
         embed.set_author(name=user, icon_url=user.avatar_url)
-        for case in entry.items:
+        for case in entries:
             timestamp = case.date.strftime("%B %d, %Y, %I:%M %p")
             if case._type == "WARN" or case._type == "LIFTWARN":
                 if case.lifted:
@@ -102,7 +114,6 @@ class MenuPages(menus.MenuPages):
 class UserInfo(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.user_cache = {}
 
     @commands.guild_only()
     @commands.command(name="userinfo", aliases=["info"])
@@ -127,11 +138,11 @@ class UserInfo(commands.Cog):
         if isinstance(user, int):
             if not is_mod:
                 raise commands.BadArgument("You do not have permission to use this command.")
-            try:
-                user = await self.bot.fetch_user(user)
-            except discord.NotFound:
+            fetched = await self.bot.settings.fetch_user(user)
+            if fetched is None:
                 raise commands.BadArgument(
                     f"Couldn't find user with ID {user}")
+            user = fetched
 
         if not is_mod and user.id != ctx.author.id:
             await ctx.message.delete()
@@ -237,7 +248,6 @@ class UserInfo(commands.Cog):
                 f"Command only allowed in <#{bot_chan}>")
 
         results = await self.bot.settings.leaderboard()
-        ctx.user_cache = self.user_cache
         menus = MenuPages(source=LeaderboardSource(
             enumerate(results), key=lambda t: 1, per_page=10), clear_reactions_after=True)
 
@@ -318,24 +328,23 @@ class UserInfo(commands.Cog):
                     f"You don't have permissions to check others' cases.")
 
         if isinstance(user, int):
-            user = await self.bot.fetch_user(user)
-            if user is None:
+            fetched = await self.bot.settings.fetch_user(user)
+            if fetched is None:
                 raise commands.BadArgument(
                     f"Couldn't find user with ID {user}")
+            user = fetched
             ctx.args[2] = user
 
-        results = await self.bot.settings.cases(user.id)
-        if len(results.cases) == 0:
+        count = await self.bot.settings.count_cases(user.id)
+        if count == 0:
             if isinstance(user, int):
                 raise commands.BadArgument(
                     f'User with ID {user.id} had no cases.')
             else:
                 raise commands.BadArgument(f'{user.mention} had no cases.')
-        cases = [case for case in results.cases if case._type != "UNMUTE"]
-        cases.reverse()
 
         menus = MenuPages(source=CasesSource(
-            cases, key=lambda t: 1, per_page=9), clear_reactions_after=True)
+            self.bot.settings, user.id, count, per_page=9), clear_reactions_after=True)
         await ctx.message.delete()
         await menus.start(ctx)
 
@@ -358,14 +367,7 @@ class UserInfo(commands.Cog):
 
 
 def xp_for_next_level(next):
-    level = 0
-    xp = 0
-
-    for _ in range(0, next):
-        xp = xp + 45 * level * (floor(level / 10) + 1)
-        level += 1
-
-    return xp
+    return xp_for_level(next)
 
 
 async def determine_emoji(type):
@@ -135,7 +135,7 @@ class Giveaway(commands.Cog):
         await ctx.message.delete()
 
         giveaway = GiveawayDB(_id=message.id, channel=responses['channel'].id, name=responses['name'], winners=responses['winners'])
-        giveaway.save()
+        await self.bot.settings.save(giveaway)
 
         await ctx.send(f"Giveaway started!", embed=embed, delete_after=10)
 
@@ -176,7 +176,7 @@ class Giveaway(commands.Cog):
             the_winner = None
 
         g.previous_winners.append(the_winner.id)
-        g.save()
+        await self.bot.settings.save(g)
 
         await ctx.message.delete()
         channel = ctx.guild.get_channel(g.channel)
@@ -204,7 +204,7 @@ class Giveaway(commands.Cog):
             raise commands.BadArgument("That giveaway has already ended.")
 
         await ctx.message.delete()
-        self.bot.settings.tasks.tasks.remove_job(str(message.id + 2), 'default')
+        self.bot.settings.tasks.cancel_end_giveaway(message.id)
         await end_giveaway(message.channel.id, message.id, giveaway.winners)
 
     @giveaway.error
@@ -53,9 +53,7 @@ class Filters(commands.Cog):
             raise commands.BadArgument(
                 "You need to be a moderator or higher to use that command.")
 
-        cur = await self.bot.settings.user(ctx.author.id)
-        cur.offline_report_ping = val
-        cur.save()
+        await self.bot.settings.set_offline_ping(ctx.author.id, val)
 
         if val:
             await ctx.send("You will now be pinged for reports when offline")
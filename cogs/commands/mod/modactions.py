@@ -6,7 +6,6 @@ import cogs.utils.logs as logging
 import discord
 import humanize
 import pytimeparse
-from data.case import Case
 from discord.ext import commands
 
 
@@ -72,31 +71,24 @@ class ModActions(commands.Cog):
 
         # if the ID given is of a user who isn't in the guild, try to fetch the profile
         if isinstance(user, int):
-            try:
-                user = await self.bot.fetch_user(user)
-            except discord.NotFound:
+            fetched = await self.bot.settings.fetch_user(user)
+            if fetched is None:
                 raise commands.BadArgument(
                     f"Couldn't find user with ID {user}")
-
-        guild = self.bot.settings.guild()
+            user = fetched
 
         reason = discord.utils.escape_markdown(reason)
         reason = discord.utils.escape_mentions(reason)
 
-        # prepare the case object for database
-        case = Case(
-            _id=guild.case_id,
+        # reserve the next case ID and add the new case to DB
+        case = await self.bot.settings.create_case(
+            user.id,
             _type="WARN",
             mod_id=ctx.author.id,
             mod_tag=str(ctx.author),
             reason=reason,
             punishment=str(points)
         )
-
-        # increment case ID in database for next available case ID
-        await self.bot.settings.inc_caseid()
-        # add new case to DB
-        await self.bot.settings.add_case(user.id, case)
         # add warnpoints to the user in DB
         await self.bot.settings.inc_points(user.id, points)
 
@@ -178,8 +170,7 @@ class ModActions(commands.Cog):
         await self.check_permissions(ctx, user)
 
         # retrieve user's case with given ID
-        cases = await self.bot.settings.get_case(user.id, case_id)
-        case = cases.cases.filter(_id=case_id).first()
+        case = await self.bot.settings.get_case(user.id, case_id)
 
         reason = discord.utils.escape_markdown(reason)
         reason = discord.utils.escape_mentions(reason)
@@ -206,7 +197,7 @@ class ModActions(commands.Cog):
         case.lifted_by_tag = str(ctx.author)
         case.lifted_by_id = ctx.author.id
         case.lifted_date = datetime.datetime.now()
-        cases.save()
+        await self.bot.settings.lift_case(user.id, case)
 
         # remove the warn points from the user in DB
         await self.bot.settings.inc_points(user.id, -1 * int(case.punishment))
@@ -265,8 +256,9 @@ class ModActions(commands.Cog):
         # remove the warn points from the user in DB
         await self.bot.settings.inc_points(user.id, -1 * points)
 
-        case = Case(
-            _id=self.bot.settings.guild().case_id,
+        # add case to db
+        case = await self.bot.settings.create_case(
+            user.id,
             _type="REMOVEPOINTS",
             mod_id=ctx.author.id,
             mod_tag=str(ctx.author),
@@ -274,11 +266,6 @@ class ModActions(commands.Cog):
             reason=reason,
         )
 
-        # increment DB's max case ID for next case
-        await self.bot.settings.inc_caseid()
-        # add case to db
-        await self.bot.settings.add_case(user.id, case)
-
         # prepare log embed, send to #public-mod-logs, user, channel where invoked
         log = await logging.prepare_removepoints_log(ctx.author, user, case)
         try:
@@ -377,20 +364,15 @@ class ModActions(commands.Cog):
             await public_chan.send(embed=log)
 
     async def add_kick_case(self, ctx, user, reason):
-        # prepare case for DB
-        case = Case(
-            _id=self.bot.settings.guild().case_id,
+        # add new case to DB
+        case = await self.bot.settings.create_case(
+            user.id,
             _type="KICK",
             mod_id=ctx.author.id,
             mod_tag=str(ctx.author),
             reason=reason,
         )
 
-        # increment max case ID for next case
-        await self.bot.settings.inc_caseid()
-        # add new case to DB
-        await self.bot.settings.add_case(user.id, case)
-
         return await logging.prepare_kick_log(ctx.author, user, case)
 
     @commands.guild_only()
@@ -419,11 +401,11 @@ class ModActions(commands.Cog):
 
         # if the ID given is of a user who isn't in the guild, try to fetch the profile
         if isinstance(user, int):
-            try:
-                user = await self.bot.fetch_user(user)
-            except discord.NotFound:
+            fetched = await self.bot.settings.fetch_user(user)
+            if fetched is None:
                 raise commands.BadArgument(
                     f"Couldn't find user with ID {user}")
+            user = fetched
 
         log = await self.add_ban_case(ctx, user, reason)
 
@@ -449,20 +431,15 @@ class ModActions(commands.Cog):
             await public_chan.send(embed=log)
 
     async def add_ban_case(self, ctx, user, reason):
-        # prepare the case to store in DB
-        case = Case(
-            _id=self.bot.settings.guild().case_id,
+        # add case to db
+        case = await self.bot.settings.create_case(
+            user.id,
             _type="BAN",
             mod_id=ctx.author.id,
             mod_tag=str(ctx.author),
             punishment="PERMANENT",
             reason=reason,
         )
-
-        # increment DB's max case ID for next case
-        await self.bot.settings.inc_caseid()
-        # add case to db
-        await self.bot.settings.add_case(user.id, case)
         # prepare log embed to send to #public-mod-logs, user and context
         return await logging.prepare_ban_log(ctx.author, user, case)
 
@@ -490,25 +467,23 @@ class ModActions(commands.Cog):
         reason = discord.utils.escape_markdown(reason)
         reason = discord.utils.escape_mentions(reason)
 
-        try:
-            user = await self.bot.fetch_user(user)
-        except discord.NotFound:
+        fetched = await self.bot.settings.fetch_user(user)
+        if fetched is None:
             raise commands.BadArgument(f"Couldn't find user with ID {user}")
+        user = fetched
 
         try:
             await ctx.guild.unban(discord.Object(id=user.id), reason=reason)
         except discord.NotFound:
             raise commands.BadArgument(f"{user} is not banned.")
 
-        case = Case(
-            _id=self.bot.settings.guild().case_id,
+        case = await self.bot.settings.create_case(
+            user.id,
             _type="UNBAN",
             mod_id=ctx.author.id,
             mod_tag=str(ctx.author),
             reason=reason,
         )
-        await self.bot.settings.inc_caseid()
-        await self.bot.settings.add_case(user.id, case)
 
         log = await logging.prepare_unban_log(ctx.author, user, case)
         await ctx.message.reply(embed=log, delete_after=10)
@@ -591,33 +566,32 @@ class ModActions(commands.Cog):
         if mute_role in user.roles:
             raise commands.BadArgument("This user is already muted.")
 
-        case = Case(
-            _id=self.bot.settings.guild().case_id,
-            _type="MUTE",
-            date=now,
-            mod_id=ctx.author.id,
-            mod_tag=str(ctx.author),
-            reason=reason,
-        )
-
+        until = None
         if delta:
             try:
-                time = now + datetime.timedelta(seconds=delta)
-                case.until = time
-                case.punishment = humanize.naturaldelta(
-                    time - now, minimum_unit="seconds")
-                self.bot.settings.tasks.schedule_unmute(user.id, time)
+                until = now + datetime.timedelta(seconds=delta)
+                punishment = humanize.naturaldelta(
+                    until - now, minimum_unit="seconds")
+                self.bot.settings.tasks.schedule_unmute(user.id, until)
             except Exception:
                 raise commands.BadArgument(
                     "An error occured, this user is probably already muted")
         else:
-            case.punishment = "PERMANENT"
+            punishment = "PERMANENT"
 
-        await self.bot.settings.inc_caseid()
-        await self.bot.settings.add_case(user.id, case)
+        case = await self.bot.settings.create_case(
+            user.id,
+            _type="MUTE",
+            date=now,
+            until=until,
+            mod_id=ctx.author.id,
+            mod_tag=str(ctx.author),
+            reason=reason,
+            punishment=punishment,
+        )
         u = await self.bot.settings.user(id=user.id)
         u.is_muted = True
-        u.save()
+        await self.bot.settings.save(u)
 
         await user.add_roles(mute_role)
 
@@ -664,22 +638,20 @@ class ModActions(commands.Cog):
 
         u = await self.bot.settings.user(id=user.id)
         u.is_muted = False
-        u.save()
+        await self.bot.settings.save(u)
 
         try:
             self.bot.settings.tasks.cancel_unmute(user.id)
         except Exception:
             pass
 
-        case = Case(
-            _id=self.bot.settings.guild().case_id,
+        case = await self.bot.settings.create_case(
+            user.id,
             _type="UNMUTE",
             mod_id=ctx.author.id,
             mod_tag=str(ctx.author),
             reason=reason,
         )
-        await self.bot.settings.inc_caseid()
-        await self.bot.settings.add_case(user.id, case)
 
         log = await logging.prepare_unmute_log(ctx.author, user, case)
 
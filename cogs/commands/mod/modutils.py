@@ -5,7 +5,6 @@ import typing
 import humanize
 
 import discord
-from data.case import Case
 from discord.ext import commands
 
 
@@ -57,11 +56,11 @@ class ModUtils(commands.Cog):
                 "You need to be at least an Administrator to use that command.")
 
         if isinstance(oldmember, int):
-            try:
-                oldmember = await self.bot.fetch_user(oldmember)
-            except discord.NotFound:
+            fetched = await self.bot.settings.fetch_user(oldmember)
+            if fetched is None:
                 raise commands.BadArgument(
                     f"Couldn't find user with ID {oldmember}")
+            oldmember = fetched
 
         u, case_count = await self.bot.settings.transfer_profile(oldmember.id, newmember.id)
 
@@ -111,10 +110,14 @@ class ModUtils(commands.Cog):
         results.is_clem = True
         results.is_xp_frozen = True
         results.warn_points = 599
-        results.save()
+        await self.bot.settings.save(results)
+        # otherwise buffered XP keeps counting, and leveling up, until the next flush
+        if self.bot.settings.xp_buffer is not None:
+            self.bot.settings.xp_buffer.forget(user.id)
 
-        case = Case(
-            _id=self.bot.settings.guild().case_id,
+        # add case to db
+        await self.bot.settings.create_case(
+            user.id,
             _type="CLEM",
             mod_id=ctx.author.id,
             mod_tag=str(ctx.author),
@@ -122,11 +125,6 @@ class ModUtils(commands.Cog):
             reason="No reason."
         )
 
-        # increment DB's max case ID for next case
-        await self.bot.settings.inc_caseid()
-        # add case to db
-        await self.bot.settings.add_case(user.id, case)
-
         await ctx.message.reply(f"{user.mention} was put on clem.", allowed_mentions=discord.AllowedMentions(everyone=False, users=False, roles=False))
 
     @commands.guild_only()
@@ -154,7 +152,7 @@ class ModUtils(commands.Cog):
 
         results = await self.bot.settings.user(user.id)
         results.is_music_banned = True
-        results.save()
+        await self.bot.settings.save(results)
         
         await ctx.send("Done", delete_after=5)
 
@@ -184,7 +182,7 @@ class ModUtils(commands.Cog):
         results = await self.bot.settings.user(user.id)
         results.birthday_excluded = True
         results.birthday = None
-        results.save()
+        await self.bot.settings.save(results)
 
         birthday_role = ctx.guild.get_role(self.bot.settings.guild().role_birthday)
         if birthday_role is None:
@@ -220,7 +218,7 @@ class ModUtils(commands.Cog):
 
         results = await self.bot.settings.user(user.id)
         results.birthday = None
-        results.save()
+        await self.bot.settings.save(results)
 
         try:
             self.bot.settings.tasks.cancel_unbirthday(user.id)
@@ -272,7 +270,7 @@ class ModUtils(commands.Cog):
 
         results = await self.bot.settings.user(user.id)
         results.birthday = [month, date]
-        results.save()
+        await self.bot.settings.save(results)
 
         await ctx.message.reply(f"{user.mention}'s birthday was set.", allowed_mentions=discord.AllowedMentions(everyone=False, users=False, roles=False), delete_after=5)
         await ctx.message.delete(delay=5)
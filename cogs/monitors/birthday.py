@@ -2,48 +2,13 @@ import discord
 from datetime import datetime, timedelta
 import pytz
 import traceback
-from discord.ext import tasks, commands
+from discord.ext import commands
 
 class Birthday(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.birthday.start()
 
-    def cog_unload(self):
-        self.birthday.cancel()
-
-    @tasks.loop(seconds=900)
-    async def birthday(self):
-        eastern = pytz.timezone('US/Eastern')
-        today = datetime.today().astimezone(eastern)
-        date = [today.month, today.day]
-        birthdays = await self.bot.settings.retrieve_birthdays(date)
-        guild = self.bot.get_guild(self.bot.settings.guild_id)
-
-        if not guild:
-            return
-        birthday_role = guild.get_role(self.bot.settings.guild().role_birthday)
-        if not birthday_role:
-            return
-        for person in birthdays:
-            if person.birthday_excluded:
-                continue
-            user = guild.get_member(person._id)
-            if birthday_role in user.roles:
-                continue
-            
-            now = datetime.now(eastern)
-            h = now.hour / 24
-            m = now.minute / 60 / 24
-
-            try:
-                time = now + timedelta(days=1-h-m)
-                self.bot.settings.tasks.schedule_remove_bday(user.id, time)
-            except Exception as e:
-                print(e)
-                continue
-            await user.add_roles(birthday_role)
-            await user.send(f"According to my calculations, today is your birthday! We've given you the {birthday_role} role for 36 hours.")
+    # birthday roles are given out once a day by the give_birthdays job in cogs/utils/tasks.py
 
     @commands.guild_only()
     @commands.command(name="mybirthday")
@@ -87,7 +52,7 @@ class Birthday(commands.Cog):
                 "You already have a birthday set! You need to ask a mod to change it.")
 
         results.birthday = [month, date]
-        results.save()
+        await self.bot.settings.save(results)
 
         await ctx.message.reply(f"{user.mention}'s birthday was set.", allowed_mentions=discord.AllowedMentions(everyone=False, users=False, roles=False), delete_after=5)
         await ctx.message.delete(delay=5)
@@ -1,15 +1,44 @@
 import discord
 from discord.ext import commands
-import aiohttp
 import re
+from collections import OrderedDict
 from enum import Enum
 import traceback
 import asyncio
 
+# Discord doesn't take emojis bigger than this
+MAX_EMOJI_SIZE = 256 * 1024
+
+
+def sniff_image(data: bytes):
+    """Find the type of an image from its first bytes, rather than trusting what the server says.
+
+    Returns
+    -------
+    str
+        The MIME type, or None if it isn't a PNG, JPEG, GIF or WebP image
+    """
+
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return "image/png"
+    if data.startswith(b'\xff\xd8\xff'):
+        return "image/jpeg"
+    if data.startswith((b'GIF87a', b'GIF89a')):
+        return "image/gif"
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return "image/webp"
+    return None
+
 
 class BoosterEmojis(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # URL -> (image bytes or None if it isn't an image, error message if it was too big)
+        self.fetched = OrderedDict()
+        self.max_fetched = 64
+        # recent messages in the booster emoji channel, so approving one doesn't need to fetch it
+        self.messages = OrderedDict()
+        self.max_messages = 100
 
     @commands.command(name='auditemojis', hidden=True)
     async def auditemojis(self, ctx: commands.Context):
@@ -25,49 +54,52 @@ class BoosterEmojis(commands.Cog):
             return
 
         await ctx.message.delete()
-        count = 0
-        async for msg in channel.history():
-            try:
-                _bytes, _ = await self.get_bytes(msg)
-            except commands.BadArgument:
-                await self.add_reactions(False, msg)
-                continue
-            
-            if _bytes is not None:
-                await self.add_reactions(True, msg)
-                count += 1
-            else:
-                await self.add_reactions(False, msg)
+        semaphore = asyncio.Semaphore(5)
+
+        async def audit(msg):
+            async with semaphore:
+                try:
+                    _bytes, _ = await self.get_bytes(msg)
+                except commands.BadArgument:
+                    _bytes = None
+
+                await self.add_reactions(_bytes is not None, msg)
+                return _bytes is not None
+
+        messages = await channel.history().flatten()
+        count = sum(await asyncio.gather(*[audit(msg) for msg in messages]))
 
         await ctx.send(f"Found {count} emojis and added reacts for them.", delete_after=5)
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
-        if not payload.member:
+        # everything we can check from the payload alone comes first, so that reactions
+        # anywhere else in the server don't cost an API call
+        db = self.bot.settings
+        if payload.guild_id != db.guild_id:
             return
-        if not payload.member.guild:
+        if payload.channel_id != db.guild().channel_booster_emoji:
             return
-        if payload.member.bot:
+        if not str(payload.emoji) in ['✅', '❌']:
             return
-        channel = payload.member.guild.get_channel(payload.channel_id)
-        try:
-            msg = await channel.fetch_message(payload.message_id)
-        except Exception:
+        if not payload.member or payload.member.bot:
             return
-        db = self.bot.settings
 
-        if not msg.guild.id == db.guild_id:
-            return
-        if not payload.channel_id == db.guild().channel_booster_emoji:
-            return
-        if payload.channel_id != self.bot.settings.guild().channel_booster_emoji:
-            return
-        if not str(payload.emoji) in ['✅', '❌']:
+        channel = payload.member.guild.get_channel(payload.channel_id)
+        if channel is None:
             return
         if not self.bot.settings.permissions.hasAtLeast(payload.member.guild, payload.member, 5):
-            await msg.remove_reaction(payload.emoji, payload.member)
+            await channel.get_partial_message(payload.message_id).remove_reaction(payload.emoji, payload.member)
             return
 
+        msg = self.messages.pop(payload.message_id, None)
+        if msg is None:
+            try:
+                msg = await channel.fetch_message(payload.message_id)
+            except discord.HTTPException:
+                return
+        self.remember(msg)
+
         if str(payload.emoji) == '❌':
             await msg.delete()
             return
@@ -140,8 +172,22 @@ class BoosterEmojis(commands.Cog):
             await msg.delete(delay=5)
             return
 
+        self.remember(msg)
         await self.add_reactions(good=_bytes is not None, msg=msg)
 
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        self.messages.pop(payload.message_id, None)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload):
+        self.messages.pop(payload.message_id, None)
+
+    def remember(self, msg: discord.Message) -> None:
+        self.messages[msg.id] = msg
+        while len(self.messages) > self.max_messages:
+            self.messages.popitem(last=False)
+
     async def get_bytes(self, msg):
         custom_emojis = re.findall(r'<:\d+>|<:.+?:\d+>', msg.content)
         if len(custom_emojis) == 1:
@@ -185,20 +231,40 @@ class BoosterEmojis(commands.Cog):
             await msg.add_reaction('❓')
 
     async def do_content_parsing(self, url):
-        async with aiohttp.ClientSession() as session:
-            async with session.head(url) as resp:
-                if resp.status != 200:
-                    return None
-                elif resp.headers["CONTENT-TYPE"] not in ["image/png", "image/jpeg", "image/gif", "image/webp"]:
-                    return None
-                elif int(resp.headers['CONTENT-LENGTH']) > 257000:
-                    raise commands.BadArgument(f"Image was too big ({int(int(resp.headers['CONTENT-LENGTH'])/1000)}KB)")
-                else:
-                    async with session.get(url) as resp2:
-                        if resp2.status != 200:
-                            return None
+        if url in self.fetched:
+            self.fetched.move_to_end(url)
+            data, error = self.fetched[url]
+        else:
+            result = await self.fetch_image(url)
+            if result is None:
+                # the request failed, which might not happen next time, so don't remember it
+                return None
+            data, error = result
+            self.fetched[url] = (data, error)
+            while len(self.fetched) > self.max_fetched:
+                self.fetched.popitem(last=False)
 
-                        return await resp2.read()
+        if error is not None:
+            raise commands.BadArgument(error)
+        return data
+
+    async def fetch_image(self, url):
+        # one GET, read in chunks so we stop as soon as the image is too big, whatever CONTENT-LENGTH says
+        async with self.bot.settings.http.get(url) as resp:
+            if resp.status != 200:
+                return None
+            if resp.content_length is not None and resp.content_length > MAX_EMOJI_SIZE:
+                return None, f"Image was too big ({int(resp.content_length/1000)}KB)"
+
+            data = bytearray()
+            async for chunk in resp.content.iter_chunked(16384):
+                data += chunk
+                if len(data) > MAX_EMOJI_SIZE:
+                    return None, f"Image was too big (over {int(MAX_EMOJI_SIZE/1000)}KB)"
+
+        if sniff_image(data) is None:
+            return None, None
+        return bytes(data), None
 
     @auditemojis.error
     async def info_error(self, ctx, error):
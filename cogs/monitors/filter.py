@@ -1,16 +1,17 @@
+import asyncio
 import datetime
 import re
-import string
+import time
 import traceback
+from collections import OrderedDict
 
 import cogs.utils.logs as logging
 import discord
 import humanize
 import pytimeparse
-from cogs.monitors.report import report
-from data.case import Case
+from cogs.monitors.report import ReportAggregator
+from cogs.utils.normalize import normalize
 from discord.ext import commands
-from fold_to_ascii import fold
 
 
 class FilterMonitor(commands.Cog):
@@ -19,6 +20,14 @@ class FilterMonitor(commands.Cog):
         self.spoiler_filter = r'\|\|(.*?)\|\|'
         self.invite_filter = r'(?:https?://)?discord(?:(?:app)?\.com/invite|\.gg)\/{1,}[a-zA-Z0-9]+/?'
         self.spam_cooldown = commands.CooldownMapping.from_cooldown(2, 10.0, commands.BucketType.user)
+        # invite code -> (ID of the guild it points to or None if it's invalid, when the entry expires),
+        # least recently used first
+        self.invite_cache = OrderedDict()
+        self.invite_cache_ttl = 3600
+        self.max_invite_cache = 1000
+        # invite code -> task fetching that invite, so a raid posting the same invite only fetches it once
+        self.invite_lookups = {}
+        self.reports = ReportAggregator(bot)
 
     @commands.Cog.listener()
     async def on_message(self, msg):
@@ -34,30 +43,28 @@ class FilterMonitor(commands.Cog):
         """
         BAD WORD FILTER
         """
-        symbols = (u"абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ",
-                   u"abBrdeex3nnKnmHonpcTyoxu4wwbbbeoRABBrDEEX3NNKNMHONPCTyOXU4WWbbbEOR")
-
-        tr = {ord(a): ord(b) for a, b in zip(*symbols)}
-
-        folded_message = fold(msg.content.translate(tr).lower()).lower()
-        folded_without_spaces = "".join(folded_message.split())
-        folded_without_spaces_and_punctuation = folded_without_spaces.translate(str.maketrans('', '', string.punctuation))
+        folded_message, _, folded_without_spaces_and_punctuation = normalize(msg.content)
 
         if folded_message:
+            matcher = self.bot.settings.word_matcher()
+            found = matcher.search(folded_message)
+            # remove all whitespace, punctuation in message and run filter again
+            # prevent a potential false positive, sorry for langauge :(
+            found |= {i for i in matcher.search(folded_without_spaces_and_punctuation) if matcher.words[i].word != "fag"}
+
             reported = False
-            for word in guild.filter_words:
-                if not self.bot.settings.permissions.hasAtLeast(msg.guild, msg.author, word.bypass):
-                    if (word.word.lower() in folded_message) or \
-                        (word.word != "fag" and word.word.lower() in folded_without_spaces_and_punctuation):
-                        # remove all whitespace, punctuation in message and run filter again
-                        # prevent a potential false positive, sorry for langauge :(
-                        await self.delete(msg)
-                        if not reported:
-                            await self.ratelimit(msg)
-                            reported = True
-                        if word.notify:
-                            await report(self.bot, msg, msg.author)
-                            return
+            can_bypass = {}
+            for word in matcher.matched(found):
+                if word.bypass not in can_bypass:
+                    can_bypass[word.bypass] = self.bot.settings.permissions.hasAtLeast(msg.guild, msg.author, word.bypass)
+                if not can_bypass[word.bypass]:
+                    await self.delete(msg)
+                    if not reported:
+                        await self.ratelimit(msg)
+                        reported = True
+                    if word.notify:
+                        await self.reports.report(msg, msg.author)
+                        return
         """
         INVITE FILTER
         """
@@ -66,26 +73,12 @@ class FilterMonitor(commands.Cog):
                 invites = re.findall(self.invite_filter, msg.content, flags=re.S)
                 if invites:
                     whitelist = self.bot.settings.guild().filter_excluded_guilds
-                    for invite in invites:
-                        try:
-                            invite = await self.bot.fetch_invite(invite)
-
-                            id = None
-                            if isinstance(invite, discord.Invite):
-                                id = invite.guild.id
-                            elif isinstance(invite, discord.PartialInviteGuild) or isinstance(invite, discord.PartialInviteChannel):
-                                id = invite.id
-
-                            if id not in whitelist:
-                                await self.delete(msg)
-                                await self.ratelimit(msg)
-                                await report(self.bot, msg, msg.author, invite)
-                                return
-
-                        except discord.errors.NotFound:
+                    guild_ids = await asyncio.gather(*[self.resolve_invite(invite) for invite in invites])
+                    for invite, id in zip(invites, guild_ids):
+                        if id not in whitelist:
                             await self.delete(msg)
                             await self.ratelimit(msg)
-                            await report(self.bot, msg, msg.author, invite)
+                            await self.reports.report(msg, msg.author, invite)
                             return
         """
         SPOILER FILTER
@@ -111,6 +104,53 @@ class FilterMonitor(commands.Cog):
                     await self.ratelimit(msg)
                     return
 
+    async def resolve_invite(self, invite: str):
+        """Look up the ID of the guild an invite points to. Results are cached for an hour,
+        including invites that don't exist.
+
+        Parameters
+        ----------
+        invite : str
+            Invite link or code
+
+        Returns
+        -------
+        int
+            ID of the guild, or None if the invite is invalid
+        """
+
+        code = discord.utils.resolve_invite(invite)
+        now = time.monotonic()
+
+        cached = self.invite_cache.get(code)
+        if cached is not None and cached[1] > now:
+            self.invite_cache.move_to_end(code)
+            return cached[0]
+
+        lookup = self.invite_lookups.get(code)
+        if lookup is None:
+            lookup = self.bot.loop.create_task(self.fetch_invite_guild(code))
+            self.invite_lookups[code] = lookup
+            lookup.add_done_callback(lambda _: self.invite_lookups.pop(code, None))
+
+        id = await asyncio.shield(lookup)
+
+        self.invite_cache[code] = (id, now + self.invite_cache_ttl)
+        self.invite_cache.move_to_end(code)
+        while len(self.invite_cache) > self.max_invite_cache:
+            self.invite_cache.popitem(last=False)
+        return id
+
+    async def fetch_invite_guild(self, code: str):
+        try:
+            invite = await self.bot.fetch_invite(code)
+        except discord.errors.NotFound:
+            return None
+
+        if invite.guild is None:
+            return None
+        return invite.guild.id
+
     async def ratelimit(self, message):
         current = message.created_at.replace(tzinfo=datetime.timezone.utc).timestamp()
 
@@ -143,31 +183,31 @@ class FilterMonitor(commands.Cog):
         if mute_role in user.roles or u.is_muted:
             return
 
-        case = Case(
-            _id=self.bot.settings.guild().case_id,
-            _type="MUTE",
-            date=now,
-            mod_id=ctx.me.id,
-            mod_tag=str(ctx.me),
-            reason=reason,
-        )
-
+        until = None
+        punishment = None
         if delta:
             try:
-                time = now + datetime.timedelta(seconds=delta)
-                case.until = time
-                case.punishment = humanize.naturaldelta(
-                    time - now, minimum_unit="seconds")
-                self.bot.settings.tasks.schedule_unmute(user.id, time)
+                until = now + datetime.timedelta(seconds=delta)
+                punishment = humanize.naturaldelta(
+                    until - now, minimum_unit="seconds")
+                self.bot.settings.tasks.schedule_unmute(user.id, until)
             except Exception:
                 raise commands.BadArgument(
                     "An error occured, this user is probably already muted")
 
-        await self.bot.settings.inc_caseid()
-        await self.bot.settings.add_case(user.id, case)
+        case = await self.bot.settings.create_case(
+            user.id,
+            _type="MUTE",
+            date=now,
+            until=until,
+            mod_id=ctx.me.id,
+            mod_tag=str(ctx.me),
+            reason=reason,
+            punishment=punishment,
+        )
         u = await self.bot.settings.user(id=user.id)
         u.is_muted = True
-        u.save()
+        await self.bot.settings.save(u)
 
         await user.add_roles(mute_role)
 
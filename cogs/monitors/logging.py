@@ -5,8 +5,8 @@ from io import BytesIO
 import discord
 from discord.ext import commands
 from collections import defaultdict
-from fold_to_ascii import fold
 from typing import List
+from cogs.utils.normalize import normalize
 
 class Logging(commands.Cog):
     def __init__(self, bot):
@@ -298,21 +298,15 @@ class Logging(commands.Cog):
             await private.send(embed=embed)
 
     async def nick_filter(self, member):
-        guild = self.bot.settings.guild()
         nick = member.display_name
-
-        symbols = (u"абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ",
-                   u"abBrdeex3nnKnmHonpcTyoxu4wwbbbeoRABBrDEEX3NNKNMHONPCTyOXU4WWbbbEOR")
-
-        tr = {ord(a): ord(b) for a, b in zip(*symbols)}
-
-        folded_message = fold(nick.translate(tr).lower())
+        folded_message = normalize(nick).folded
 
         if folded_message:
-            for word in guild.filter_words:
+            matcher = self.bot.settings.word_matcher()
+            for word in matcher.matched(matcher.search(folded_message)):
                 if not self.bot.settings.permissions.hasAtLeast(member.guild, member, word.bypass):
-                    if word.word.lower() in folded_message.lower():
-                        await member.edit(nick="change name pls", reason=f"filter triggered ({nick})")
+                    await member.edit(nick="change name pls", reason=f"filter triggered ({nick})")
+                    return
 
     async def member_roles_update(self, before, after, roles, added):
         embed = discord.Embed()
@@ -3,12 +3,15 @@ from discord.ext import commands
 import traceback
 import asyncio
 import re
+from collections import OrderedDict
 
 
 class ReactionRoles(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.cached_messages = {}
+        # least recently used reaction role messages, so a click doesn't need to fetch the message
+        self.cached_messages = OrderedDict()
+        self.max_cached_messages = 50
 
     @commands.command(name='setreactions', hidden=True)
     @commands.guild_only()
@@ -61,11 +64,11 @@ class ReactionRoles(commands.Cog):
             prompt_embed = await ctx.send("Add the reaction to this message that you want to watch for (or :white_check_mark: to stop).")
             stack.append(prompt_embed)
 
-            def check_reaction(reaction, user):
-                return user.id == ctx.author.id and reaction.message.id == prompt_embed.id
+            def check_reaction(payload):
+                return payload.user_id == ctx.author.id
 
             try:
-                reaction, _ = await self.bot.wait_for('reaction_add', timeout=30.0, check=check_reaction)
+                payload = await self.bot.settings.reactions.wait_for(prompt_embed.id, check=check_reaction, timeout=30.0)
             except asyncio.TimeoutError:
                 try:
                     stack = await delete_stack(stack)
@@ -73,11 +76,13 @@ class ReactionRoles(commands.Cog):
                 except Exception:
                     pass
             else:
-                if str(reaction.emoji) == "✅":
+                if str(payload.emoji) == "✅":
                     stack = await delete_stack(stack)
                     break
 
-                if isinstance(reaction.emoji, discord.PartialEmoji) or (isinstance(reaction.emoji, discord.Emoji) and not reaction.emoji.available):
+                # custom emojis from servers the bot isn't in can't be used
+                emoji = str(payload.emoji) if payload.emoji.is_unicode_emoji() else self.bot.get_emoji(payload.emoji.id)
+                if emoji is None or (isinstance(emoji, discord.Emoji) and not emoji.available):
                     stack = await delete_stack(stack)
                     await ctx.send("That emoji is not available to me :(", delete_after=5)
                     continue
@@ -100,8 +105,8 @@ class ReactionRoles(commands.Cog):
                         if the_role is None:
                             stack = await delete_stack(stack)
                         else:
-                            reaction_mapping[message.id][str(reaction.emoji)] = the_role.id
-                            reactions.append(reaction)
+                            reaction_mapping[message.id][str(emoji)] = the_role.id
+                            reactions.append(emoji)
                             stack = await delete_stack(stack)
                             break
 
@@ -111,7 +116,7 @@ class ReactionRoles(commands.Cog):
 
         async with ctx.channel.typing():
             for r in reactions:
-                the_string += f"Reaction {str(r)} will give role <@&{reaction_mapping[message.id][str(r.emoji)]}>\n"
+                the_string += f"Reaction {str(r)} will give role <@&{reaction_mapping[message.id][str(r)]}>\n"
                 await message.add_reaction(r)
 
         await ctx.send(the_string, delete_after=10)
@@ -171,11 +176,11 @@ class ReactionRoles(commands.Cog):
             prompt_embed = await ctx.send("Add the reaction to this message that you want to watch for (or :white_check_mark: to cancel).")
             stack.append(prompt_embed)
 
-            def check_reaction(reaction, user):
-                return user.id == ctx.author.id and reaction.message.id == prompt_embed.id
+            def check_reaction(payload):
+                return payload.user_id == ctx.author.id
 
             try:
-                reaction, _ = await self.bot.wait_for('reaction_add', timeout=30.0, check=check_reaction)
+                payload = await self.bot.settings.reactions.wait_for(prompt_embed.id, check=check_reaction, timeout=30.0)
             except asyncio.TimeoutError:
                 try:
                     stack = await delete_stack(stack)
@@ -183,11 +188,13 @@ class ReactionRoles(commands.Cog):
                 except Exception:
                     pass
             else:
-                if str(reaction.emoji) == "✅":
+                if str(payload.emoji) == "✅":
                     stack = await delete_stack(stack)
                     return
 
-                if isinstance(reaction.emoji, discord.PartialEmoji) or (isinstance(reaction.emoji, discord.Emoji) and not reaction.emoji.available):
+                # custom emojis from servers the bot isn't in can't be used
+                emoji = str(payload.emoji) if payload.emoji.is_unicode_emoji() else self.bot.get_emoji(payload.emoji.id)
+                if emoji is None or (isinstance(emoji, discord.Emoji) and not emoji.available):
                     stack = await delete_stack(stack)
                     await ctx.send("That emoji is not available to me :(", delete_after=5)
                     continue
@@ -210,8 +217,8 @@ class ReactionRoles(commands.Cog):
                         if the_role is None:
                             stack = await delete_stack(stack)
                         else:
-                            reaction_mapping[message.id][str(reaction.emoji)] = the_role.id
-                            reactions.append(reaction)
+                            reaction_mapping[message.id][str(emoji)] = the_role.id
+                            reactions.append(emoji)
                             stack = await delete_stack(stack)
                             break
                 break
@@ -221,7 +228,7 @@ class ReactionRoles(commands.Cog):
 
         async with ctx.channel.typing():
             for r in reactions:
-                the_string += f"Reaction {str(r)} will give role <@&{reaction_mapping[message.id][str(r.emoji)]}>\n"
+                the_string += f"Reaction {str(r)} will give role <@&{reaction_mapping[message.id][str(r)]}>\n"
                 await message.add_reaction(r)
 
         await ctx.send(the_string, delete_after=10)
@@ -325,10 +332,10 @@ class ReactionRoles(commands.Cog):
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
-        if payload.member.bot:
-            return
         if not payload.guild_id:
             return
+        if payload.member.bot:
+            return
         if payload.channel_id != self.bot.settings.guild().channel_reaction_roles:
             return
 
@@ -336,8 +343,11 @@ class ReactionRoles(commands.Cog):
         if payload.message_id not in self.cached_messages:
             message = await channel.fetch_message(payload.message_id)
             self.cached_messages[payload.message_id] = message
+            while len(self.cached_messages) > self.max_cached_messages:
+                self.cached_messages.popitem(last=False)
         else:
             message = self.cached_messages[payload.message_id]
+            self.cached_messages.move_to_end(payload.message_id)
 
         mapping = await self.bot.settings.get_rero_mapping(str(payload.message_id))
         if mapping is None:
@@ -1,59 +1,179 @@
 import asyncio
 import datetime
+import time
+from collections import OrderedDict
 
 import discord
 import humanize
 
-
-async def report(bot, msg, user, invite=None):
-    role = msg.guild.get_role(bot.settings.guild().role_moderator)
-    channel = msg.guild.get_channel(bot.settings.guild().channel_reports)
-
-    ping_string = ""
-    for member in role.members:
-        offline_ping = (await bot.settings.user(member.id)).offline_report_ping
-        if member.status == discord.Status.online or offline_ping:
-            ping_string += f"{member.mention} "
-
-    embed = await prepare_embed(bot, user, msg)
-
-    if invite:
-        report_msg = await channel.send(f"{ping_string}\nMessage contained invite: {invite}", embed=embed)
-    else:
-        report_msg = await channel.send(ping_string, embed=embed)
-    report_reactions = ['✅', '🆔', '🧹']
-
-    for reaction in report_reactions:
-        await report_msg.add_reaction(reaction)
-
-    def check(reaction, user):
-        res = (user.id != bot.user.id
-               and reaction.message == report_msg
-               and str(reaction.emoji) in report_reactions
-               and bot.settings.permissions.hasAtLeast(user.guild, user, 5))
-        return res
-
-    while True:
+report_reactions = ['✅', '🆔', '🧹']
+
+
+class ActiveReport:
+    """A report message that further reports about the same user or invite are folded into.
+    """
+
+    def __init__(self, key, user, invite, expires: float):
+        self.key = key
+        self.user = user
+        self.invite = invite
+        self.expires = expires
+        self.count = 1
+        self.content = ""
+        self.message = None
+        # task that edits the report count into the message, if one is scheduled
+        self.editor = None
+
+
+class ReportAggregator:
+    """Sends reports to the reports channel. Reports about the same user, or about the same invite,
+    within `window` seconds of each other go into one report message that shows how many times
+    it was reported, instead of a new message (and reaction handler) for every filtered message
+    during a raid. At most `max_waiters` report messages listen for reactions at once; when
+    there are more, the oldest one stops listening. Reactions go through Settings.reactions,
+    so reports sent before a restart keep working.
+    """
+
+    def __init__(self, bot, window: float = 60, max_waiters: int = 10):
+        self.bot = bot
+        self.window = window
+        self.max_waiters = max_waiters
+        # ("user", user ID) or ("invite", invite code) -> ActiveReport
+        self.active = {}
+        # report message ID -> key of the report, for reports listening for reactions, oldest first
+        self.waiters = OrderedDict()
+        bot.settings.reactions.handle("report", self.on_reaction, self.on_expire)
+
+    async def report(self, msg: discord.Message, user: discord.Member, invite: str = None) -> None:
+        """Report a message, or add it to the open report about the same user or invite.
+
+        Parameters
+        ----------
+        msg : discord.Message
+            The message that was filtered
+        user : discord.Member
+            Author of the message
+        invite : str, optional
+            The invite the message contained, if that's why it was filtered, by default None
+        """
+
+        key = ("invite", discord.utils.resolve_invite(invite)) if invite else ("user", user.id)
+        now = time.monotonic()
+
+        entry = self.active.get(key)
+        if entry is not None and entry.expires > now:
+            entry.count += 1
+            entry.expires = now + self.window
+            self.schedule_edit(entry)
+            return
+
+        self.active = {k: v for k, v in self.active.items() if v.expires > now}
+        entry = ActiveReport(key, user, invite, now + self.window)
+        self.active[key] = entry
+
+        role = msg.guild.get_role(self.bot.settings.guild().role_moderator)
+        channel = msg.guild.get_channel(self.bot.settings.guild().channel_reports)
+
+        ping_string = ""
+        for member in role.members:
+            if member.status == discord.Status.online or member.id in self.bot.settings.offline_pingers:
+                ping_string += f"{member.mention} "
+
+        embed = await prepare_embed(self.bot, user, msg)
+
+        if invite:
+            entry.content = f"{ping_string}\nMessage contained invite: {invite}"
+        else:
+            entry.content = ping_string
         try:
-            reaction, _ = await bot.wait_for('reaction_add', timeout=120.0, check=check)
-        except asyncio.TimeoutError:
+            entry.message = await channel.send(entry.content, embed=embed)
+        except Exception:
+            # don't fold the next reports into one that was never sent
+            if self.active.get(key) is entry:
+                self.active.pop(key)
+            raise
+        # more reports might have come in while we were sending
+        self.schedule_edit(entry)
+
+        for reaction in report_reactions:
+            await entry.message.add_reaction(reaction)
+
+        await self.start_waiter(entry)
+
+    def schedule_edit(self, entry: ActiveReport) -> None:
+        if entry.count > 1 and entry.message is not None and entry.editor is None:
+            entry.editor = self.bot.loop.create_task(self.edit_count(entry))
+
+    async def edit_count(self, entry: ActiveReport) -> None:
+        """Show how many times a report was made. Waits a bit first, so that a burst of reports
+        ends up as one edit.
+        """
+
+        await asyncio.sleep(2)
+        entry.editor = None
+        try:
+            await entry.message.edit(content=f"{entry.content}\n**Reported {entry.count} times**")
+        except discord.HTTPException:
+            pass
+
+    async def start_waiter(self, entry: ActiveReport) -> None:
+        while len(self.waiters) >= self.max_waiters:
+            message_id, _ = self.waiters.popitem(last=False)
+            self.forget(message_id)
+            handler = await self.bot.settings.reactions.unregister(message_id)
+            if handler is not None:
+                await self.on_expire(handler)
+
+        self.waiters[entry.message.id] = entry.key
+        await self.bot.settings.reactions.register(entry.message, "report", {"user_id": entry.user.id}, timeout=120)
+
+    def forget(self, message_id: int) -> None:
+        """Stop folding new reports into a report message, once mods can't dismiss it with reactions.
+        """
+
+        self.waiters.pop(message_id, None)
+        self.active = {k: v for k, v in self.active.items() if v.message is None or v.message.id != message_id}
+
+    async def on_reaction(self, payload: discord.RawReactionActionEvent, handler) -> bool:
+        """Handle a reaction on a report message, including reports sent before the bot restarted.
+
+        Returns
+        -------
+        bool
+            True when the report was dismissed
+        """
+
+        if str(payload.emoji) not in report_reactions or payload.member is None:
+            return False
+        if not self.bot.settings.permissions.hasAtLeast(payload.member.guild, payload.member, 5):
+            return False
+
+        channel = self.bot.get_channel(handler.channel_id)
+        if channel is None:
+            return True
+
+        if str(payload.emoji) == '✅':
+            self.forget(handler._id)
             try:
-                await report_msg.clear_reactions()
-                return
+                await channel.get_partial_message(handler._id).delete()
             except Exception:
                 pass
-        else:
-            if str(reaction.emoji) == '✅':
-                try:
-                    await report_msg.delete()
-                except Exception:
-                    pass
-                return
-            elif str(reaction.emoji) == '🆔':
-                await channel.send(user.id, delete_after=10)
-            elif str(reaction.emoji) == '🧹':
-                await channel.purge(limit=100)
-            
+            return True
+        elif str(payload.emoji) == '🆔':
+            await channel.send(handler.data["user_id"], delete_after=10)
+        elif str(payload.emoji) == '🧹':
+            await channel.purge(limit=100)
+        return False
+
+    async def on_expire(self, handler) -> None:
+        self.forget(handler._id)
+        channel = self.bot.get_channel(handler.channel_id)
+        if channel is None:
+            return
+        try:
+            await channel.get_partial_message(handler._id).clear_reactions()
+        except Exception:
+            pass
 
 
 async def prepare_embed(bot, user, msg):
@@ -1,8 +1,8 @@
-import math
 import traceback
 from random import randint
 
 import discord
+from cogs.utils.levels import level_for_xp
 from discord.ext import commands
 
 
@@ -40,13 +40,14 @@ class Xp(commands.Cog):
         if message.author.bot:
             return
 
-        user = await self.bot.settings.user(id=message.author.id)
-        db = self.bot.settings.guild()
-        if user.is_xp_frozen or user.is_clem:
+        xp_to_add = randint(0, 11)
+        # inc_xp returns None if the user's XP is frozen or they're on clem
+        result = await self.bot.settings.inc_xp(message.author.id, xp_to_add)
+        if result is None:
             return
 
-        xp_to_add = randint(0, 11)
-        new_xp, level_before = await self.bot.settings.inc_xp(message.author.id, xp_to_add)
+        db = self.bot.settings.guild()
+        new_xp, level_before = result
         new_level = await self.get_level(new_xp)
 
         if new_level > level_before:
@@ -81,12 +82,7 @@ class Xp(commands.Cog):
                         await obj.add_roles(role)
 
     async def get_level(self, current_xp):
-        level = 0
-        xp = 0
-        while xp <= current_xp:
-            xp = xp + 45 * level * (math.floor(level / 10) + 1)
-            level += 1
-        return level
+        return level_for_xp(current_xp)
 
     async def info_error(self, ctx, error):
         if (isinstance(error, commands.MissingRequiredArgument)
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+import re
+import time
+
+import aiohttp
+from discord.ext import tasks
+
+DEVICES_URL = "https://api.ipsw.me/v4/devices"
+FIRMWARES_URL = "https://api.ipsw.me/v4/device/"
+# groups shown by !listdevices, a device is in a group if the group's name is in the device's name
+FAMILIES = ['iPhone', 'iPod', 'iPad', 'Apple TV', 'Apple Watch', 'HomePod']
+# stupid ipsw.me api doesn't have these devices
+EXTRA_DEVICES = [{'name': 'iPhone SE 2', 'identifier': 'iPhone12,8'}]
+
+
+def normalize(name: str) -> str:
+    """Name of a device as we show it, without regional version info or brackets,
+    i.e iPhone SE (CDMA) -> iPhone SE
+    """
+
+    name = re.sub(r'\((.*?)\)', "", name)
+    name = name.replace('[', '')
+    name = name.replace(']', '')
+    return name.strip()
+
+
+class DeviceCatalog:
+    """In-memory copy of the ipsw.me device list, with the names already normalized so that
+    commands can look devices up without downloading and going through the whole list.
+    The list is refreshed in the background every `ttl` seconds, sending the ETag we got last time
+    so an unchanged list isn't downloaded again, and saved to `path` so that it's there right away
+    after a restart. Firmware lists are fetched per device when first needed and kept for `firmware_ttl` seconds.
+    """
+
+    def __init__(self, http, path: str = None, ttl: float = 21600, firmware_ttl: float = 3600):
+        """Initialize the catalog from the file on disk, if there is one, and start the refresh loop.
+
+        Parameters
+        ----------
+        http : HttpClient
+            Client used to talk to ipsw.me
+        path : str, optional
+            Where to save the device list, by default BOTTY_DEVICES_FILE or devices.json
+        ttl : float, optional
+            How often to refresh the device list, in seconds, by default 6 hours
+        firmware_ttl : float, optional
+            How long to keep the firmwares of a device, in seconds, by default 1 hour
+        """
+
+        self.http = http
+        self.path = path or os.environ.get("BOTTY_DEVICES_FILE", "devices.json")
+        self.firmware_ttl = firmware_ttl
+        self.lock = asyncio.Lock()
+        self.etag = None
+        # normalized name, lowercase -> {'name': normalized name, 'identifier': identifier}
+        self.by_name = {}
+        # family -> sorted normalized names
+        self.families = {family: [] for family in FAMILIES}
+        # identifier -> (when it expires, list of firmwares)
+        self.firmware_cache = {}
+
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    saved = json.load(f)
+                self.etag = saved.get("etag")
+                self.build(saved["devices"])
+            except (ValueError, KeyError):
+                pass
+
+        self.refresher = tasks.loop(seconds=ttl)(self.refresh)
+        self.refresher.start()
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.by_name)
+
+    def build(self, devices: list) -> None:
+        by_name = {}
+        families = {family: set() for family in FAMILIES}
+        for d in devices + EXTRA_DEVICES:
+            name = normalize(d["name"])
+            by_name[name.lower()] = {'name': name, 'identifier': d["identifier"]}
+            for family in FAMILIES:
+                if family in name:
+                    families[family].add(name)
+
+        self.by_name = by_name
+        self.families = {family: sorted(names) for family, names in families.items()}
+
+    async def refresh(self) -> None:
+        """Download the device list if it changed since we last got it.
+        """
+
+        async with self.lock:
+            headers = {'If-None-Match': self.etag} if self.etag and self.loaded else {}
+            try:
+                async with self.http.get(DEVICES_URL, headers=headers) as resp:
+                    if resp.status != 200:
+                        # 304 if nothing changed, otherwise keep what we have and try again next time
+                        return
+                    devices = await resp.json(content_type=None)
+                    etag = resp.headers.get('ETag')
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                return
+
+            self.etag = etag
+            self.build(devices)
+
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"etag": etag, "devices": devices}, f)
+            os.replace(tmp, self.path)
+
+    async def ensure_loaded(self) -> None:
+        if not self.loaded:
+            await self.refresh()
+
+    async def find(self, name: str):
+        """Look up a device by its name as shown by !listdevices, ignoring case.
+
+        Returns
+        -------
+        dict
+            {'name': ..., 'identifier': ...}, or None if there's no such device
+        """
+
+        await self.ensure_loaded()
+        return self.by_name.get(name.strip().lower())
+
+    async def firmwares(self, identifier: str):
+        """Firmwares of a device, newest first.
+
+        Returns
+        -------
+        list
+            The firmwares, or None if ipsw.me didn't answer
+        """
+
+        cached = self.firmware_cache.get(identifier)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        data = await self.http.get_json(f"{FIRMWARES_URL}{identifier}")
+        if data is None:
+            return cached[1] if cached is not None else None
+
+        self.firmware_cache[identifier] = (time.monotonic() + self.firmware_ttl, data["firmwares"])
+        return data["firmwares"]
+
+    def stop(self) -> None:
+        self.refresher.cancel()
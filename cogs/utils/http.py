@@ -0,0 +1,100 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import aiohttp
+
+
+class HttpClient:
+    """One aiohttp session for the whole bot, so requests to ipsw.me or the Discord CDN reuse
+    pooled keep-alive connections instead of doing a DNS lookup and TLS handshake every time.
+    The session is created on first use, since aiohttp wants it made inside the event loop.
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 10, timeout: float = 15):
+        """Initialize the client.
+
+        Parameters
+        ----------
+        limit : int, optional
+            Maximum number of open connections, by default 100
+        limit_per_host : int, optional
+            Maximum number of open connections to the same host, by default 10
+        timeout : float, optional
+            Total timeout of a request in seconds, by default 15
+        """
+
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = None
+        # host -> [requests, failed requests, total seconds spent]
+        self.metrics = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                             ttl_dns_cache=300, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    @property
+    def requests(self) -> int:
+        return sum(m[0] for m in self.metrics.values())
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, **kwargs):
+        """Make a request, used like `aiohttp.ClientSession.request`:
+        `async with client.request("GET", url) as resp: ...`
+
+        Parameters
+        ----------
+        method : str
+            HTTP method
+        url : str
+            URL to request
+        **kwargs
+            Passed on to aiohttp
+        """
+
+        metrics = self.metrics.setdefault(urlsplit(url).hostname, [0, 0, 0.0])
+        metrics[0] += 1
+        start = time.monotonic()
+        try:
+            async with self.session.request(method, url, **kwargs) as resp:
+                if resp.status >= 400:
+                    metrics[1] += 1
+                yield resp
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            metrics[1] += 1
+            raise
+        finally:
+            metrics[2] += time.monotonic() - start
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+    async def get_json(self, url: str, **kwargs):
+        """GET a URL and parse the response as JSON.
+
+        Returns
+        -------
+        object
+            The parsed body, or None if the request didn't return 200
+        """
+
+        async with self.get(url, **kwargs) as resp:
+            if resp.status != 200:
+                return None
+            # ipsw.me doesn't always send a JSON content type
+            return await resp.json(content_type=None)
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
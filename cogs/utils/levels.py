@@ -0,0 +1,55 @@
+from bisect import bisect_right
+from math import floor
+
+# cumulative[n] is the sum of 45 * level * (floor(level / 10) + 1) over every level below n,
+# which is the XP curve the bot has always used
+cumulative = [0]
+
+
+def _extend(level: int) -> None:
+    """Grow the cumulative XP table until it covers `level`.
+    """
+
+    while len(cumulative) <= level:
+        n = len(cumulative) - 1
+        cumulative.append(cumulative[-1] + 45 * n * (floor(n / 10) + 1))
+
+
+_extend(1000)
+
+
+def xp_for_level(level: int) -> int:
+    """Total XP needed to finish level `level`.
+
+    Parameters
+    ----------
+    level : int
+        The level
+
+    Returns
+    -------
+    int
+        Total XP
+    """
+
+    _extend(level)
+    return cumulative[level]
+
+
+def level_for_xp(xp: int) -> int:
+    """The level a user with `xp` total XP is at.
+
+    Parameters
+    ----------
+    xp : int
+        Total XP of the user
+
+    Returns
+    -------
+    int
+        The user's level
+    """
+
+    while cumulative[-1] <= xp:
+        _extend(len(cumulative) * 2)
+    return bisect_right(cumulative, xp)
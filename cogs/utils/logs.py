@@ -99,3 +99,19 @@ async def prepare_unmute_log(author, user, case):
     embed.set_footer(text=f"Case #{case._id} | {user.id}")
     embed.timestamp = case.date
     return embed
+
+
+async def prepare_bulk_unmute_log(author, unmuted, reason):
+    # one embed per 20 members, `unmuted` is a list of (member, case) pairs
+    embeds = []
+    for i in range(0, len(unmuted), 20):
+        chunk = unmuted[i:i + 20]
+        embed = discord.Embed(title="Members Unmuted")
+        embed.color = discord.Color.green()
+        embed.description = "\n".join(f"{user.mention} ({user}) - Case #{case._id}" for user, case in chunk)
+        embed.add_field(name="Mod", value=f'{author} ({author.mention})', inline=True)
+        embed.add_field(name="Reason", value=reason, inline=True)
+        embed.set_footer(text=f"{len(unmuted)} members unmuted")
+        embed.timestamp = chunk[0][1].date
+        embeds.append(embed)
+    return embeds
@@ -0,0 +1,35 @@
+import string
+from collections import namedtuple
+from functools import lru_cache
+
+from fold_to_ascii import fold
+
+# Cyrillic letters that look like latin ones, mapped to what they look like
+symbols = (u"абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ",
+           u"abBrdeex3nnKnmHonpcTyoxu4wwbbbeoRABBrDEEX3NNKNMHONPCTyOXU4WWbbbEOR")
+
+cyrillic_table = {ord(a): ord(b) for a, b in zip(*symbols)}
+punctuation_table = str.maketrans('', '', string.punctuation)
+
+NormalizedText = namedtuple('NormalizedText', ['folded', 'without_spaces', 'without_spaces_and_punctuation'])
+
+
+@lru_cache(maxsize=2048)
+def normalize(text: str) -> NormalizedText:
+    """Fold text down to lowercase ASCII for the word filter. Results are cached by content,
+    so spam and message edits that repeat the same text are only normalized once.
+
+    Parameters
+    ----------
+    text : str
+        Message content or nickname to normalize
+
+    Returns
+    -------
+    NormalizedText
+        The folded text, the folded text without whitespace, and the folded text without whitespace and punctuation
+    """
+
+    folded = fold(text.translate(cyrillic_table).lower()).lower()
+    without_spaces = "".join(folded.split())
+    return NormalizedText(folded, without_spaces, without_spaces.translate(punctuation_table))
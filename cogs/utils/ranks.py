@@ -0,0 +1,60 @@
+from bisect import bisect_left, insort
+
+
+class XpRanks:
+    """In-memory copy of every user's XP, kept as a sorted list so that a user's leaderboard rank
+    can be found with a binary search instead of counting documents in the database.
+    Settings keeps it in sync whenever it changes a user's XP.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        # sorted XP of every user
+        self.xps = []
+        # user ID -> XP
+        self.by_user = {}
+        # updates that happened while we were loading from the database
+        self.pending = {}
+
+    def load(self, users) -> None:
+        """Fill the structure from the database.
+
+        Parameters
+        ----------
+        users : iterable
+            (user ID, XP) pairs of every user
+        """
+
+        by_user = dict(users)
+        by_user.update(self.pending)
+        self.pending = {}
+        self.by_user = by_user
+        self.xps = sorted(by_user.values())
+        self.loaded = True
+
+    def update(self, id: int, xp: int) -> None:
+        """Set the XP of a user, adding them if we haven't seen them before.
+        """
+
+        if not self.loaded:
+            self.pending[id] = xp
+            return
+
+        old = self.by_user.get(id)
+        if old == xp:
+            return
+        if old is not None:
+            del self.xps[bisect_left(self.xps, old)]
+        insort(self.xps, xp)
+        self.by_user[id] = xp
+
+    def rank(self, xp: int) -> tuple:
+        """Rank of a user with `xp` XP, same as counting the users with at least that much XP.
+
+        Returns
+        -------
+        tuple
+            (rank, number of users)
+        """
+
+        return (len(self.xps) - bisect_left(self.xps, xp), len(self.xps))
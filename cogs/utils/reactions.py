@@ -0,0 +1,179 @@
+import asyncio
+import datetime
+import traceback
+
+import discord
+from discord.ext import tasks
+
+from data.reactionhandler import ReactionHandler
+
+
+class ReactionDispatcher:
+    """Routes raw reaction events to whoever is listening for reactions on that message, looked up
+    by message ID, instead of every reaction in the guild going through every pending wait_for check.
+
+    There are two kinds of listeners:
+    - handlers, registered with `register` under a kind (i.e "report") whose callbacks a cog sets up
+      with `handle`. They're stored in the database, so they keep working after a restart.
+    - one-off waiters from `wait_for`, for prompts that only live as long as a command does.
+    """
+
+    def __init__(self, settings, sweep_interval: float = 30):
+        """Initialize the dispatcher and start the loop that expires handlers.
+
+        Parameters
+        ----------
+        settings : Settings
+            State of the bot, used to run queries on the database thread pool
+        sweep_interval : float, optional
+            How often to look for expired handlers, in seconds, by default 30
+        """
+
+        self.settings = settings
+        self.bot = settings.bot
+        # kind -> (on_reaction, on_expire)
+        self.kinds = {}
+        # message ID -> ReactionHandler
+        self.handlers = {}
+        # message ID -> [(future, check)]
+        self.waiters = {}
+        self.sweeper = tasks.loop(seconds=sweep_interval)(self.sweep)
+        self.sweeper.start()
+
+    @property
+    def active(self) -> int:
+        """Number of handlers and waiters currently listening for reactions.
+        """
+
+        return len(self.handlers) + sum(len(waiters) for waiters in self.waiters.values())
+
+    def handle(self, kind: str, on_reaction, on_expire=None) -> None:
+        """Set the callbacks for handlers of a kind.
+
+        Parameters
+        ----------
+        kind : str
+            Name of the kind of handler
+        on_reaction : coroutine function
+            Called with the payload and the ReactionHandler for every reaction on the message.
+            Returns True when the handler is done and should be removed.
+        on_expire : coroutine function, optional
+            Called with the ReactionHandler when it times out, by default None
+        """
+
+        self.kinds[kind] = (on_reaction, on_expire)
+
+    async def load(self) -> None:
+        """Read the handlers registered before the bot was restarted.
+        """
+
+        for handler in await self.settings.run(lambda: list(ReactionHandler.objects)):
+            self.handlers.setdefault(handler._id, handler)
+
+    async def register(self, message: discord.Message, kind: str, data: dict = None, timeout: float = None) -> None:
+        """Listen for reactions on a message, replacing whatever was listening on it before.
+
+        Parameters
+        ----------
+        message : discord.Message
+            The message
+        kind : str
+            Kind of handler, see `handle`
+        data : dict, optional
+            Anything the handler needs to know, stored with it, by default None
+        timeout : float, optional
+            Stop listening after this many seconds, by default None (never)
+        """
+
+        expires = None
+        if timeout is not None:
+            expires = datetime.datetime.now() + datetime.timedelta(seconds=timeout)
+
+        handler = ReactionHandler(_id=message.id, channel_id=message.channel.id, kind=kind, data=data or {}, expires=expires)
+        self.handlers[message.id] = handler
+        await self.settings.save(handler)
+
+    async def unregister(self, message_id: int) -> ReactionHandler:
+        """Stop listening for reactions on a message.
+
+        Returns
+        -------
+        ReactionHandler
+            The handler that was removed, or None if there wasn't one
+        """
+
+        handler = self.handlers.pop(message_id, None)
+        if handler is not None:
+            await self.settings.run(ReactionHandler.objects(_id=message_id).delete)
+        return handler
+
+    async def wait_for(self, message_id: int, check=None, timeout: float = None) -> discord.RawReactionActionEvent:
+        """Wait for a reaction on a message, like bot.wait_for('raw_reaction_add').
+
+        Parameters
+        ----------
+        message_id : int
+            ID of the message
+        check : callable, optional
+            Only return reactions this returns True for, by default None
+        timeout : float, optional
+            Seconds to wait before raising asyncio.TimeoutError, by default None
+
+        Returns
+        -------
+        discord.RawReactionActionEvent
+            The reaction
+        """
+
+        future = self.bot.loop.create_future()
+        waiter = (future, check)
+        self.waiters.setdefault(message_id, []).append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            waiters = self.waiters.get(message_id, [])
+            if waiter in waiters:
+                waiters.remove(waiter)
+            if not waiters:
+                self.waiters.pop(message_id, None)
+
+    async def dispatch(self, payload: discord.RawReactionActionEvent) -> None:
+        if payload.user_id == self.bot.user.id:
+            return
+
+        for future, check in self.waiters.get(payload.message_id, []):
+            if future.done():
+                continue
+            try:
+                if check is None or check(payload):
+                    future.set_result(payload)
+            except Exception as e:
+                future.set_exception(e)
+
+        handler = self.handlers.get(payload.message_id)
+        if handler is None or handler.kind not in self.kinds:
+            return
+        if handler.expires is not None and handler.expires <= datetime.datetime.now():
+            return
+
+        on_reaction, _ = self.kinds[handler.kind]
+        if await on_reaction(payload, handler):
+            await self.unregister(payload.message_id)
+
+    async def sweep(self) -> None:
+        """Remove the handlers that timed out.
+        """
+
+        now = datetime.datetime.now()
+        expired = [handler for handler in self.handlers.values() if handler.expires is not None and handler.expires <= now]
+        for handler in expired:
+            await self.unregister(handler._id)
+            _, on_expire = self.kinds.get(handler.kind, (None, None))
+            if on_expire is not None:
+                try:
+                    await on_expire(handler)
+                except Exception:
+                    traceback.print_exc()
+
+    def stop(self) -> None:
+        self.sweeper.cancel()
@@ -1,9 +1,23 @@
+import asyncio
+import datetime
+import functools
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import discord
 import mongoengine
+from cogs.utils.http import HttpClient
+from cogs.utils.ranks import XpRanks
+from cogs.utils.reactions import ReactionDispatcher
+from cogs.utils.tagstore import TagStore
 from cogs.utils.tasks import Tasks
+from cogs.utils.users import UserCache
+from cogs.utils.wordmatcher import WordMatcher
+from cogs.utils.xpbuffer import XpBuffer
 from data.case import Case
+from data.caserecord import CaseRecord
 from data.cases import Cases
 from data.filterword import FilterWord
 from data.guild import Guild
@@ -11,6 +25,8 @@ from data.tag import Tag
 from data.user import User
 from data.giveaway import Giveaway
 from discord.ext import commands
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 
 class Settings(commands.Cog):
@@ -38,15 +54,95 @@ class Settings(commands.Cog):
         self.tasks = None
         self.bot = bot
         self.guild_id = int(os.environ.get("BOTTY_MAINGUILD"))
+        self._guild = None
+        # bumped by every reload_guild, so that a slow reload doesn't overwrite a newer one
+        self._guild_reloads = 0
+        self._word_matcher = None
+        # message ID -> {emoji: role ID}, built from guild().reaction_role_mapping
+        self._rero = None
+        # case IDs we already reserved in the database but haven't used yet
+        self._case_ids = []
+        self.case_id_block = int(os.environ.get("BOTTY_CASE_ID_BLOCK", 1))
+        # mongoengine is blocking, so every query goes through this pool instead of running on the event loop
+        self.executor = ThreadPoolExecutor(max_workers=int(os.environ.get("BOTTY_DB_WORKERS", 4)), thread_name_prefix="botty-db")
         self.permissions = Permissions(self.bot, self)
 
+        self.ranks = XpRanks()
+        self.users = UserCache(self.bot)
+        self.http = HttpClient()
+        self.tags = TagStore(self, 60)
+        self.reactions = ReactionDispatcher(self)
+        # IDs of users who want to be pinged for reports even when offline
+        self.offline_pingers = set()
+        self.xp_buffer = None
+        if os.environ.get("BOTTY_XP_BATCH_SECONDS"):
+            self.xp_buffer = XpBuffer(self, float(os.environ.get("BOTTY_XP_BATCH_SECONDS")))
+
         print("Loaded database")
 
+    def cog_unload(self):
+        if self.tasks is not None:
+            self.tasks.stop()
+        self.tags.stop()
+        self.reactions.stop()
+        if self.xp_buffer is not None:
+            self.xp_buffer.stop()
+        self.executor.shutdown(wait=False)
+        self.bot.loop.create_task(self.http.close())
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking database call on the database thread pool and wait for the result,
+        without blocking the event loop.
+
+        Parameters
+        ----------
+        func : callable
+            The blocking function to call, i.e `document.save` or a QuerySet method
+
+        Returns
+        -------
+        Whatever `func` returns.
+        """
+
+        return await self.bot.loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def save(self, document: mongoengine.Document) -> None:
+        """Save a document that was changed by the caller, i.e a User returned from `user()`.
+
+        Parameters
+        ----------
+        document : mongoengine.Document
+            The document to save
+        """
+
+        await self.run(document.save)
+
     async def load_tasks(self):
+        # on_ready fires again after a reconnect, everything here only needs to happen once
+        if self.tasks is not None:
+            return
+
         self.tasks = Tasks(self.bot)
+        migrated = await self.run(self.migrate_cases)
+        if migrated:
+            print(f"Moved {migrated} cases to their own collection")
+        if "birthdays" not in self.tasks.jobs:
+            self.tasks.schedule_birthdays(datetime.datetime.now())
+        if self.tasks.fresh:
+            # no job log to restore from, i.e the first start after moving off APScheduler,
+            # so rebuild the unmutes from the mute cases of users who are still muted
+            for id, until in await self.run(self.pending_unmutes):
+                self.tasks.schedule_unmute(id, until)
+        await self.tags.load()
+        await self.reactions.load()
+        self.offline_pingers = set(await self.run(lambda: [u['_id'] for u in User._get_collection().find({'offline_report_ping': True}, {'_id': 1})]))
+        self.ranks.load(await self.run(lambda: [(u['_id'], u.get('xp', 0)) for u in User._get_collection().find({}, {'xp': 1})]))
+        if os.environ.get("BOTTY_CHANGE_STREAMS"):
+            threading.Thread(target=self.watch_guild, daemon=True).start()
 
     def guild(self) -> Guild:
-        """Returns the state of the main guild from the database.
+        """Returns the state of the main guild. The document is only read from the database
+        the first time, after that we serve the cached copy, which writers refresh with `reload_guild()`.
 
         Returns
         -------
@@ -54,7 +150,122 @@ class Settings(commands.Cog):
             The Guild document object that holds information about the main guild.
         """
 
-        return Guild.objects(_id=self.guild_id).first()
+        if self._guild is None:
+            self._guild = Guild.objects(_id=self.guild_id).first()
+        return self._guild
+
+    async def load_guild(self) -> Guild:
+        """Same as `guild()`, but on a cache miss the document is read on the database thread pool.
+        Used to warm the cache without blocking the event loop.
+
+        Returns
+        -------
+        Guild
+            The Guild document object that holds information about the main guild.
+        """
+
+        if self._guild is None:
+            self._guild = await self.run(Guild.objects(_id=self.guild_id).first)
+        return self._guild
+
+    async def reload_guild(self) -> Guild:
+        """Read the Guild document again on the database thread pool and replace the cached copy.
+        Every method that writes to the Guild document without going through the cached copy must call this,
+        so that `guild()` never has to read it on the event loop.
+
+        Returns
+        -------
+        Guild
+            The Guild document object that holds information about the main guild.
+        """
+
+        self._guild_reloads += 1
+        reload = self._guild_reloads
+        guild = await self.run(Guild.objects(_id=self.guild_id).first)
+        if reload == self._guild_reloads:
+            self._guild = guild
+            self._rero = None
+            self.permissions.invalidate()
+        return guild
+
+    async def on_guild_changed(self) -> None:
+        await self.reload_guild()
+        self.invalidate_word_matcher()
+
+    def word_matcher(self) -> WordMatcher:
+        """Returns the automaton used to match filtered words in messages. It is built from
+        `guild().filter_words` the first time, and rebuilt only after the filter words change.
+
+        Returns
+        -------
+        WordMatcher
+            Matcher over the current filter words
+        """
+
+        if self._word_matcher is None:
+            self._word_matcher = WordMatcher(self.guild().filter_words)
+        return self._word_matcher
+
+    def invalidate_word_matcher(self) -> None:
+        self._word_matcher = None
+
+    def watch_guild(self) -> None:
+        """Reload the guild cache whenever the Guild document is changed outside of the bot,
+        using a MongoDB change stream. Runs in its own thread because pymongo's change streams block.
+        Change streams need MongoDB to be running as a replica set, so this is only started
+        if BOTTY_CHANGE_STREAMS is set in the .env file.
+        """
+
+        pipeline = [{'$match': {'documentKey._id': self.guild_id}}]
+        try:
+            with Guild._get_collection().watch(pipeline) as stream:
+                for _ in stream:
+                    asyncio.run_coroutine_threadsafe(self.on_guild_changed(), self.bot.loop)
+        except Exception as e:
+            print(f"Guild change stream stopped: {e}")
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        await self.reactions.dispatch(payload)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.roles != after.roles:
+            self.permissions.invalidate(after.id)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        self.permissions.invalidate(member.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.permissions != after.permissions:
+            self.permissions.invalidate()
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.permissions.invalidate()
+
+    @commands.Cog.listener()
+    async def on_guild_update(self, before: discord.Guild, after: discord.Guild):
+        if before.owner_id != after.owner_id:
+            self.permissions.invalidate()
+
+    async def fetch_user(self, id: int) -> discord.User:
+        """Look up a Discord user by ID, through the bot-wide user cache.
+
+        Parameters
+        ----------
+        id : int
+            ID of the user
+
+        Returns
+        -------
+        discord.User
+            The user, or None if no user with that ID exists
+        """
+
+        return await self.users.fetch(id)
 
     async def get_nsa_channel(self, id) -> dict:
         """Returns the state of the main guild from the database.
@@ -85,7 +296,22 @@ class Settings(commands.Cog):
             "channel_id": channel_id,
             "webhook_id": webhook_id,
         }
-        g.save()
+        await self.save(g)
+
+    def rero_index(self) -> dict:
+        """Returns the reaction role mappings keyed by message ID, so that a reaction role click is
+        a dict lookup. Built from `guild().reaction_role_mapping` the first time, then kept in sync
+        by the rero mapping methods below.
+
+        Returns
+        -------
+        dict
+            message ID (int) -> {emoji: role ID}
+        """
+
+        if self._rero is None:
+            self._rero = {int(message_id): dict(mapping) for message_id, mapping in self.guild().reaction_role_mapping.items()}
+        return self._rero
 
     async def all_rero_mappings(self):
         g = self.guild()
@@ -98,7 +324,8 @@ class Settings(commands.Cog):
         the_key = list(mapping.keys())[0]
         current[str(the_key)] = mapping[the_key]
         g.reaction_role_mapping = current
-        g.save()
+        await self.save(g)
+        self.rero_index()[int(the_key)] = dict(mapping[the_key])
 
     async def append_rero_mapping(self, mapping):
         g = self.guild()
@@ -106,63 +333,186 @@ class Settings(commands.Cog):
         the_key = list(mapping.keys())[0]
         current[str(the_key)] = current[str(the_key)] | mapping[the_key]
         g.reaction_role_mapping = current
-        g.save()
+        await self.save(g)
+        self.rero_index()[int(the_key)] = dict(current[str(the_key)])
 
     async def get_rero_mapping(self, id):
-        g = self.guild()
-        if id in g.reaction_role_mapping:
-            return g.reaction_role_mapping[id]
-        else:
-            return None
+        return self.rero_index().get(int(id))
 
     async def delete_rero_mapping(self, id):
         g = self.guild()
         if str(id) in g.reaction_role_mapping.keys():
             g.reaction_role_mapping.pop(str(id))
-            g.save()
+            await self.save(g)
+        self.rero_index().pop(int(id), None)
 
     async def save_emoji_webhook(self, id):
-        g = Guild.objects(_id=self.guild_id).first()
+        g = self.guild()
         g.emoji_logging_webhook = id
-        g.save()
+        await self.save(g)
 
     async def leaderboard(self) -> list:
-        return User.objects[0:100].only('_id', 'xp').order_by('-xp', '-_id').select_related()
+        return await self.run(lambda: list(User.objects[0:100].only('_id', 'xp', 'level').order_by('-xp', '-_id')))
 
     async def leaderboard_rank(self, xp):
+        if self.ranks.loaded:
+            return self.ranks.rank(xp)
+
         users = User.objects().only('_id', 'xp')
-        overall = users().count()
-        rank = users(xp__gte=xp).count()
+        overall = await self.run(users().count)
+        rank = await self.run(users(xp__gte=xp).count)
         return (rank, overall)
 
-    async def inc_caseid(self) -> None:
-        """Increments Guild.case_id, which keeps track of the next available ID to
-        use for a case.
+    async def reserve_case_ids(self, count: int) -> list:
+        """Atomically reserve `count` case IDs with one find_one_and_update, so that two punishments
+        happening at the same time can never get the same case ID.
+
+        Parameters
+        ----------
+        count : int
+            How many IDs to reserve
+
+        Returns
+        -------
+        list
+            The reserved case IDs, in order
+        """
+
+        g = await self.run(Guild._get_collection().find_one_and_update,
+                           {'_id': self.guild_id},
+                           {'$inc': {'case_id': count}},
+                           projection={'case_id': 1},
+                           return_document=ReturnDocument.BEFORE)
+        first = g['case_id']
+        if self._guild is not None:
+            self._guild.case_id = max(self._guild.case_id, first + count)
+        return list(range(first, first + count))
+
+    async def next_case_id(self) -> int:
+        """Returns the next case ID to use. IDs are reserved from the database BOTTY_CASE_ID_BLOCK
+        at a time (1 by default). With bigger blocks most cases don't need a round trip for their ID,
+        but IDs left over in the block when the bot restarts are skipped.
+        """
+
+        if not self._case_ids:
+            self._case_ids.extend(await self.reserve_case_ids(self.case_id_block))
+        return self._case_ids.pop(0)
+
+    async def create_case(self, user_id: int, **fields) -> Case:
+        """Create a case for a user: reserve its ID and store it with a single insert.
+
+        Parameters
+        ----------
+        user_id : int
+            ID of the user who we want to add the case to.
+        **fields
+            Fields of the Case, except for `_id`
+
+        Returns
+        -------
+        Case
+            The case that was added
+        """
+
+        case = Case(_id=await self.next_case_id(), **fields)
+        await self.add_case(user_id, case)
+        return case
+
+    async def create_cases(self, user_ids: list, **fields) -> list:
+        """Create the same kind of case for several users, reserving all the IDs at once and storing
+        all the cases with one insert.
+
+        Parameters
+        ----------
+        user_ids : list
+            IDs of the users
+        **fields
+            Fields of the Cases, except for `_id`
+
+        Returns
+        -------
+        list
+            The cases that were added, in the same order as `user_ids`
+        """
+
+        if not user_ids:
+            return []
+
+        cases = [Case(_id=case_id, **fields) for case_id in await self.reserve_case_ids(len(user_ids))]
+        records = [CaseRecord.from_case(user_id, case) for user_id, case in zip(user_ids, cases)]
+        await self.run(CaseRecord.objects.insert, records, load_bulk=False)
+        return cases
+
+    async def set_muted(self, ids: list, val: bool) -> None:
+        """Set whether several users are muted, with one update.
         """
 
-        Guild.objects(_id=self.guild_id).update_one(inc__case_id=1)
+        await self.run(User.objects(_id__in=ids).update, set__is_muted=val)
 
     async def inc_xp(self, id, xp):
-        """Increments user xp.
+        """Increments user xp, creating the User document if needed. If BOTTY_XP_BATCH_SECONDS is set,
+        the increment goes through the write-behind buffer instead.
+
+        Parameters
+        ----------
+        id : int
+            The user's ID
+        xp : int
+            Amount of XP to add
+
+        Returns
+        -------
+        tuple
+            (xp, level) of the user after the increment, or None if the user's XP is frozen
         """
 
-        await self.user(id)
-        User.objects(_id=id).update_one(inc__xp=xp)
-        u = User.objects(_id=id).first()
-        return (u.xp, u.level)
+        if self.xp_buffer is not None:
+            res = await self.xp_buffer.add(id, xp)
+        else:
+            res = await self.run(self._inc_xp, id, xp)
+
+        if res is not None:
+            self.ranks.update(id, res[0])
+        return res
+
+    def _inc_xp(self, id, xp):
+        """Blocking part of `inc_xp`: one find_one_and_update that upserts the user,
+        increments their XP and returns the new document.
+        """
+
+        defaults = User().to_mongo().to_dict()
+        defaults.pop('_id', None)
+        defaults.pop('xp', None)
+
+        query = {'_id': id, 'is_xp_frozen': {'$ne': True}, 'is_clem': {'$ne': True}}
+        try:
+            u = User._get_collection().find_one_and_update(
+                query,
+                {'$inc': {'xp': xp}, '$setOnInsert': defaults},
+                upsert=True,
+                return_document=ReturnDocument.AFTER)
+        except DuplicateKeyError:
+            # either the user exists but their XP is frozen, or another message created them
+            # at the same time, in which case the plain update goes through
+            u = User._get_collection().find_one_and_update(
+                query,
+                {'$inc': {'xp': xp}},
+                return_document=ReturnDocument.AFTER)
+            if u is None:
+                return None
+        return (u['xp'], u['level'])
 
     async def inc_level(self, id) -> None:
         """Increments user level.
         """
 
-        await self.user(id)
-        User.objects(_id=id).update_one(inc__level=1)
+        await self.run(User.objects(_id=id).update_one, inc__level=1, upsert=True)
+        if self.xp_buffer is not None:
+            self.xp_buffer.level_up(id)
 
     async def add_case(self, _id: int, case: Case) -> None:
-        """Cases holds all the cases for a particular user with id `_id` as an
-        EmbeddedDocumentListField. This function appends a given case object to
-        this list. If this user doesn't have any previous cases, we first add
-        a new Cases document to the database.
+        """Every case is stored as its own CaseRecord document, indexed by user and date.
+        This function stores a given case for the user with ID `_id`.
 
         Parameters
         ----------
@@ -172,60 +522,70 @@ class Settings(commands.Cog):
             The case we want to add to the user.
         """
 
-        # ensure this user has a cases document before we try to append the new case
-        await self.cases(_id)
-        Cases.objects(_id=_id).update_one(push__cases=case)
+        await self.run(CaseRecord.from_case(_id, case).save)
 
     async def add_filtered_word(self, fw: FilterWord) -> None:
-        Guild.objects(_id=self.guild_id).update_one(push__filter_words=fw)
+        await self.run(Guild.objects(_id=self.guild_id).update_one, push__filter_words=fw)
+        await self.reload_guild()
+        self.invalidate_word_matcher()
 
     async def remove_filtered_word(self, word: str):
-        return Guild.objects(_id=self.guild_id).update_one(pull__filter_words__word=FilterWord(word=word).word)
+        res = await self.run(Guild.objects(_id=self.guild_id).update_one, pull__filter_words__word=FilterWord(word=word).word)
+        await self.reload_guild()
+        self.invalidate_word_matcher()
+        return res
 
     async def add_tag(self, tag: Tag) -> None:
-        Guild.objects(_id=self.guild_id).update_one(push__tags=tag)
+        await self.tags.add(tag)
 
     async def remove_tag(self, tag: str):
-        return Guild.objects(_id=self.guild_id).update_one(pull__tags__name=Tag(name=tag).name)
+        return await self.tags.remove(tag)
 
     async def get_tag(self, name: str):
-        g = Guild.objects(_id=self.guild_id).first()
-        for t in g.tags:
-            if t.name == name:
-                t.use_count += 1
-                g.save()
-                return t
-        return None
+        return await self.tags.get(name)
+
+    async def all_tags(self) -> list:
+        return await self.tags.all()
+
+    async def search_tags(self, query: str, limit: int = 10) -> list:
+        return await self.tags.search(query, limit)
+
+    async def suggest_tags(self, name: str) -> list:
+        return await self.tags.suggest(name)
 
     async def add_whitelisted_guild(self, id: int):
         g = Guild.objects(_id=self.guild_id)
-        g2 = g.first()
+        g2 = await self.load_guild()
         if id not in g2.filter_excluded_guilds:
-            g.update_one(push__filter_excluded_guilds=id)
+            await self.run(g.update_one, push__filter_excluded_guilds=id)
+            await self.reload_guild()
             return True
         return False
 
     async def remove_whitelisted_guild(self, id: int):
         g = Guild.objects(_id=self.guild_id)
-        g2 = g.first()
+        g2 = await self.load_guild()
         if id in g2.filter_excluded_guilds:
-            g.update_one(pull__filter_excluded_guilds=id)
+            await self.run(g.update_one, pull__filter_excluded_guilds=id)
+            await self.reload_guild()
             return True
         return False
 
     async def add_ignored_channel(self, id: int):
         g = Guild.objects(_id=self.guild_id)
-        g2 = g.first()
+        g2 = await self.load_guild()
         if id not in g2.filter_excluded_channels:
-            g.update_one(push__filter_excluded_channels=id)
+            await self.run(g.update_one, push__filter_excluded_channels=id)
+            await self.reload_guild()
             return True
         return False
 
     async def remove_ignored_channel(self, id: int):
         g = Guild.objects(_id=self.guild_id)
-        g2 = g.first()
+        g2 = await self.load_guild()
         if id in g2.filter_excluded_channels:
-            g.update_one(pull__filter_excluded_channels=id)
+            await self.run(g.update_one, pull__filter_excluded_channels=id)
+            await self.reload_guild()
             return True
         return False
 
@@ -243,7 +603,26 @@ class Settings(commands.Cog):
 
         # first we ensure this user has a User document in the database before continuing
         await self.user(_id)
-        User.objects(_id=_id).update_one(inc__warn_points=points)
+        await self.run(User.objects(_id=_id).update_one, inc__warn_points=points)
+
+    async def set_offline_ping(self, _id: int, val: bool) -> None:
+        """Set whether a user wants to be pinged for reports when they're offline.
+
+        Parameters
+        ----------
+        _id : int
+            ID of the user
+        val : bool
+            Whether to ping them or not
+        """
+
+        # first we ensure this user has a User document in the database before continuing
+        await self.user(_id)
+        await self.run(User.objects(_id=_id).update_one, set__offline_report_ping=val)
+        if val:
+            self.offline_pingers.add(_id)
+        else:
+            self.offline_pingers.discard(_id)
 
     async def set_warn_kicked(self, _id: int) -> None:
         """Set the `was_warn_kicked` field in the User object of the user, whose ID is given by `_id`,
@@ -258,11 +637,10 @@ class Settings(commands.Cog):
 
         # first we ensure this user has a User document in the database before continuing
         await self.user(_id)
-        User.objects(_id=_id).update_one(set__was_warn_kicked=True)
+        await self.run(User.objects(_id=_id).update_one, set__was_warn_kicked=True)
 
     async def get_case(self, _id: int, case_id: int) -> Case:
         """Get the case with ID `case_id`, which belongs to the punishee given by ID `_id`.
-        If the user doesn't have a Cases document in the database, first create that.
 
         Parameters
         ----------
@@ -274,13 +652,29 @@ class Settings(commands.Cog):
         Returns
         -------
         Case
-            The Case object representing the case.
+            The Case object representing the case, or None if the user has no such case.
         """
 
-        # first we ensure this user has a Cases document in the database before continuing
-        await self.cases(_id)
-        case = Cases.objects(_id=_id).first()
-        return case
+        record = await self.run(CaseRecord.objects(user_id=_id, case_id=case_id).first)
+        return record.to_case() if record is not None else None
+
+    async def lift_case(self, _id: int, case: Case) -> None:
+        """Store the lifted_* fields of a case we got from `get_case`
+
+        Parameters
+        ----------
+        _id : int
+            The ID of the user the case belongs to
+        case : Case
+            The case, with the lifted fields filled in
+        """
+
+        await self.run(CaseRecord.objects(user_id=_id, case_id=case._id).update_one,
+                       set__lifted=case.lifted,
+                       set__lifted_reason=case.lifted_reason,
+                       set__lifted_by_tag=case.lifted_by_tag,
+                       set__lifted_by_id=case.lifted_by_id,
+                       set__lifted_date=case.lifted_date)
 
     async def user(self, id: int) -> User:
         """Look up the User document of a user, whose ID is given by `id`.
@@ -297,63 +691,91 @@ class Settings(commands.Cog):
             The User document we found from the database.
         """
 
-        user = User.objects(_id=id).first()
+        user = await self.run(User.objects(_id=id).first)
         # first we ensure this user has a User document in the database before continuing
         if not user:
             user = User()
             user._id = id
-            user.save()
+            await self.save(user)
+            self.ranks.update(id, 0)
         return user
     
     async def transfer_profile(self, oldmember, newmember):
+        if self.xp_buffer is not None:
+            self.xp_buffer.forget(oldmember)
+            self.xp_buffer.forget(newmember)
+
         u = await self.user(oldmember)
         u._id = newmember
-        u.save()
+        await self.save(u)
         
         u2 = await self.user(oldmember)
         u2.xp = 0
         u2.level = 0
-        u2.save()
+        await self.save(u2)
         
-        cases = await self.cases(oldmember)
-        cases._id = newmember
-        cases.save()
-        
-        cases2 = await self.cases(oldmember)
-        cases2.cases = []
-        cases2.save()
+        case_count = await self.run(CaseRecord.objects(user_id=oldmember).update, set__user_id=newmember)
+
+        self.ranks.update(newmember, u.xp)
+        self.ranks.update(oldmember, 0)
+        if u.offline_report_ping:
+            self.offline_pingers.add(newmember)
         
-        return u, len(cases.cases)
+        return u, case_count
+
+    async def retrieve_birthdays(self, date) -> list:
+        """IDs of the users whose birthday is on `date`, which is [month, day], leaving out users who
+        are banned from birthdays. Uses the index on (month, day).
+        """
 
-    async def retrieve_birthdays(self, date):
-        return User.objects(birthday=date)
+        query = {'birthday.0': date[0], 'birthday.1': date[1], 'birthday_excluded': {'$ne': True}}
+        return await self.run(lambda: [u['_id'] for u in User._get_collection().find(query, {'_id': 1})])
 
-    async def cases(self, id: int) -> Cases:
-        """Return the Document representing the cases of a user, whose ID is given by `id`
-        If the user doesn't have a Cases document in the database, first create that.
+    async def count_cases(self, id: int) -> int:
+        """Count the cases of a user, whose ID is given by `id`, not counting UNMUTE cases.
+
+        Parameters
+        ----------
+        id : int
+            The user whose cases we want to count.
+
+        Returns
+        -------
+        int
+            Number of cases
+        """
+
+        return await self.run(CaseRecord.objects(user_id=id, _type__ne="UNMUTE").count)
+
+    async def cases(self, id: int, skip: int = 0, limit: int = 0) -> list:
+        """Return a page of the cases of a user, whose ID is given by `id`, newest first.
+        UNMUTE cases are left out. Only the requested page is read from the database.
 
         Parameters
         ----------
         id : int
             The user whose cases we want to look up.
+        skip : int, optional
+            Number of cases to skip, by default 0
+        limit : int, optional
+            Maximum number of cases to return, by default 0 (no limit)
 
         Returns
         -------
-        Cases
-            [description]
+        list
+            List of Case
         """
 
-        cases = Cases.objects(_id=id).first()
-        # first we ensure this user has a Cases document in the database before continuing
-        if cases is None:
-            cases = Cases()
-            cases._id = id
-            cases.save()
-        return cases
+        def page():
+            records = CaseRecord.objects(user_id=id, _type__ne="UNMUTE").order_by('-date', '-case_id').skip(skip)
+            if limit:
+                records = records.limit(limit)
+            return [record.to_case() for record in records]
+
+        return await self.run(page)
 
     async def rundown(self, id: int) -> list:
         """Return the 3 most recent cases of a user, whose ID is given by `id`
-        If the user doesn't have a Cases document in the database, first create that.
 
         Parameters
         ----------
@@ -362,24 +784,54 @@ class Settings(commands.Cog):
 
         Returns
         -------
-        Cases
-            [description]
+        list
+            List of Case
         """
 
-        cases = Cases.objects(_id=id).first()
-        # first we ensure this user has a Cases document in the database before continuing
-        if cases is None:
-            cases = Cases()
-            cases._id = id
-            cases.save()
-            return []
+        return await self.cases(id, limit=3)
+
+    def pending_unmutes(self) -> list:
+        """Find when every muted user should be unmuted, from their latest mute case.
+        Runs on the database thread pool.
+
+        Returns
+        -------
+        list
+            (user ID, datetime) pairs, leaving out permanent mutes
+        """
+
+        pending = []
+        for u in User.objects(is_muted=True).only('_id'):
+            case = CaseRecord.objects(user_id=u._id, _type="MUTE").order_by('-date').first()
+            if case is not None and case.until is not None:
+                pending.append((u._id, case.until))
+        return pending
+
+    def migrate_cases(self) -> int:
+        """Move cases out of the legacy Cases documents, where each user's cases were an embedded list,
+        into one CaseRecord document per case. Users are moved one at a time and their legacy document
+        is deleted right after, so this is a no-op once everything has been moved.
+        Runs on the database thread pool.
+
+        Returns
+        -------
+        int
+            Number of cases moved
+        """
+
+        moved = 0
+        for cases in Cases.objects(cases__0__exists=True):
+            records = [CaseRecord.from_case(cases._id, case) for case in cases.cases]
+            # in case we got interrupted after inserting this user's cases last time
+            CaseRecord._get_collection().delete_many({'user_id': cases._id, 'case_id': {'$in': [r.case_id for r in records]}})
+            CaseRecord.objects.insert(records, load_bulk=False)
+            # _id isn't the primary key of Cases, so cases.delete() would filter on mongoengine's auto id, which is None
+            Cases._get_collection().delete_one({'_id': cases._id})
+            moved += len(records)
+
+        Cases._get_collection().delete_many({})
+        return moved
 
-        cases = cases.cases
-        cases = filter(lambda x: x._type != "UNMUTE", cases)
-        cases = sorted(cases, key=lambda i: i['date'])
-        cases.reverse()
-        return cases[0:3]
-    
     async def get_giveaway(self, id: int) -> Giveaway:
         """
         Return the Document representing a giveaway, whose ID (message ID) is given by `id`
@@ -394,7 +846,7 @@ class Settings(commands.Cog):
         -------
         Giveaway
         """
-        giveaway = Giveaway.objects(_id=id).first()
+        giveaway = await self.run(Giveaway.objects(_id=id).first)
         return giveaway
     
     async def add_giveaway(self, id: int, channel: int, name: str, entries: list, winners: int, ended: bool = False, prev_winners=[]) -> None:
@@ -422,7 +874,7 @@ class Settings(commands.Cog):
         giveaway.winners = winners
         giveaway.is_ended = ended
         giveaway.previous_winners = prev_winners
-        giveaway.save()
+        await self.save(giveaway)
 
 
 class Permissions:
@@ -452,41 +904,9 @@ class Permissions:
 
         self.bot = bot
         self.settings = settings
-        guild_id = self.settings.guild_id
-        the_guild = settings.guild()
-
-        # This dict maps a permission level to a lambda function which, when given the right paramters,
-        # will return True or False if a user has that permission level.
-        self.permissions = {
-            0: lambda x, y: True,
-
-            1: (lambda guild, m: self.hasAtLeast(guild, m, 2) or (guild.id == guild_id
-                and guild.get_role(the_guild.role_memberplus) in m.roles)),
-
-            2: (lambda guild, m: self.hasAtLeast(guild, m, 3) or (guild.id == guild_id
-                and guild.get_role(the_guild.role_memberpro) in m.roles)),
-
-            3: (lambda guild, m: self.hasAtLeast(guild, m, 4) or (guild.id == guild_id
-                and guild.get_role(the_guild.role_memberedition) in m.roles)),
-
-            4: (lambda guild, m: self.hasAtLeast(guild, m, 5) or (guild.id == guild_id
-                and guild.get_role(the_guild.role_genius) in m.roles)),
-
-            5: (lambda guild, m: self.hasAtLeast(guild, m, 6) or (guild.id == guild_id
-                and guild.get_role(the_guild.role_moderator) in m.roles)),
-
-            6: (lambda guild, m: self.hasAtLeast(guild, m, 7) or (guild.id == guild_id
-                and m.guild_permissions.manage_guild)),
-
-            7: (lambda guild, m: self.hasAtLeast(guild, m, 9) or (guild.id == guild_id
-                and m == guild.owner)),
-
-            9: (lambda guild, m: guild.id == guild_id
-                and m.id == bot.owner_id),
-
-            10: (lambda guild, m: guild.id == guild_id
-                 and m.id == bot.owner_id),
-        }
+        # (guild ID, member ID) -> that member's highest permission level, least recently used first
+        self._levels = OrderedDict()
+        self.max_levels = 5000
 
         self.permission_names = {
             0: "Everyone and up",
@@ -501,9 +921,71 @@ class Permissions:
             10: "Bot owner",
         }
 
+    def level_of(self, guild: discord.Guild, member: discord.Member) -> int:
+        """Returns the highest permission level of `member` in guild `guild`. The result is cached
+        until the member's roles change or the guild's settings change.
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The guild to check
+        member : discord.Member
+            The member whose permissions we're checking
+
+        Returns
+        -------
+        int
+            The member's permission level
+        """
+
+        key = (guild.id, member.id)
+        level = self._levels.get(key)
+        if level is None:
+            level = self.compute_level(guild, member)
+            self._levels[key] = level
+            while len(self._levels) > self.max_levels:
+                self._levels.popitem(last=False)
+        else:
+            self._levels.move_to_end(key)
+        return level
+
+    def compute_level(self, guild: discord.Guild, member: discord.Member) -> int:
+        if guild.id != self.settings.guild_id:
+            return 0
+        if member.id == self.bot.owner_id:
+            return 10
+        if member == guild.owner:
+            return 7
+        if member.guild_permissions.manage_guild:
+            return 6
+
+        the_guild = self.settings.guild()
+        role_ids = {role.id for role in member.roles}
+        roles = [
+            (5, the_guild.role_moderator),
+            (4, the_guild.role_genius),
+            (3, the_guild.role_memberedition),
+            (2, the_guild.role_memberpro),
+            (1, the_guild.role_memberplus),
+        ]
+        for level, role_id in roles:
+            if role_id is not None and role_id in role_ids:
+                return level
+        return 0
+
+    def invalidate(self, member_id: int = None) -> None:
+        """Forget cached permission levels, either for one member or, if `member_id` is None, for everyone.
+        """
+
+        if member_id is None:
+            self._levels.clear()
+        else:
+            # levels are only ever non-zero in the main guild, so that's the only entry that can change
+            self._levels.pop((self.settings.guild_id, member_id), None)
+
     def hasAtLeast(self, guild: discord.Guild, member: discord.Member, level: int) -> bool:
         """Checks whether a user given by `member` has at least the permission level `level`
-        in guild `guild`. Using the `self.permissions` dict-lambda thing.
+        in guild `guild`.
 
         Parameters
         ----------
@@ -520,7 +1002,7 @@ class Permissions:
             True if the user has that level, otherwise False.
         """
 
-        return self.permissions[level](guild, member)
+        return self.level_of(guild, member) >= level
 
     def level_info(self, level: int) -> str:
         return self.permission_names[level]
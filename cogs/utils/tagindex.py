@@ -0,0 +1,102 @@
+from bisect import bisect_left, insort
+from collections import Counter
+
+
+def trigrams(text: str) -> set:
+    """The set of 3 character substrings of `text`, padded with spaces so that short names
+    and the start and end of names count too.
+    """
+
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TagIndex:
+    """Search index over tag names. Names are kept in a sorted list, so that a prefix search is
+    a binary search followed by a short scan, and in a trigram -> names map for fuzzy matches.
+    TagStore keeps it in sync when tags are added or removed.
+    """
+
+    def __init__(self, names=()):
+        # every tag name, sorted
+        self.names = []
+        # trigram -> names containing it
+        self.grams = {}
+        for name in names:
+            self.add(name)
+
+    def add(self, name: str) -> None:
+        i = bisect_left(self.names, name)
+        if i < len(self.names) and self.names[i] == name:
+            return
+
+        insort(self.names, name)
+        for gram in trigrams(name):
+            self.grams.setdefault(gram, set()).add(name)
+
+    def remove(self, name: str) -> None:
+        i = bisect_left(self.names, name)
+        if i == len(self.names) or self.names[i] != name:
+            return
+
+        del self.names[i]
+        for gram in trigrams(name):
+            names = self.grams.get(gram)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self.grams[gram]
+
+    def prefix(self, prefix: str, limit: int = 10) -> list:
+        """Names starting with `prefix`, in alphabetical order.
+        """
+
+        results = []
+        i = bisect_left(self.names, prefix)
+        while i < len(self.names) and len(results) < limit and self.names[i].startswith(prefix):
+            results.append(self.names[i])
+            i += 1
+        return results
+
+    def similar(self, query: str, limit: int = 10, threshold: float = 0.3) -> list:
+        """Names that share enough trigrams with `query`, most similar first.
+
+        Parameters
+        ----------
+        query : str
+            What to look for
+        limit : int, optional
+            Maximum number of names to return, by default 10
+        threshold : float, optional
+            Minimum similarity (shared trigrams over all trigrams of both) from 0 to 1, by default 0.3
+
+        Returns
+        -------
+        list
+            Matching names
+        """
+
+        query_grams = trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.grams.get(gram, ()))
+
+        scored = []
+        for name, count in shared.items():
+            score = count / (len(query_grams) + len(trigrams(name)) - count)
+            if score >= threshold:
+                scored.append((-score, name))
+        scored.sort()
+        return [name for _, name in scored[:limit]]
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """Names starting with `query` first, then names similar to it.
+        """
+
+        results = self.prefix(query, limit)
+        for name in self.similar(query, limit, threshold=0.2):
+            if len(results) >= limit:
+                break
+            if name not in results:
+                results.append(name)
+        return results
@@ -0,0 +1,152 @@
+from cogs.utils.tagindex import TagIndex
+from discord.ext import tasks
+from pymongo import UpdateOne
+
+from data.guild import Guild
+from data.tag import Tag
+
+
+class TagStore:
+    """In-memory copy of every tag, keyed by name, so that using a tag doesn't need a query.
+    Uses of a tag are counted in memory and written with one bulk_write every `interval` seconds.
+    """
+
+    def __init__(self, settings, interval: float):
+        """Initialize the store and start the flush loop. Tags are loaded on first use.
+
+        Parameters
+        ----------
+        settings : Settings
+            State of the bot, used to run queries on the database thread pool
+        interval : float
+            How often to write use counts to the database, in seconds
+        """
+
+        self.settings = settings
+        self.loaded = False
+        # tag name -> Tag
+        self.tags = {}
+        self.index = TagIndex()
+        # tag name -> uses since the last flush
+        self.pending = {}
+        self.flusher = tasks.loop(seconds=interval)(self.flush)
+        self.flusher.start()
+
+    def _load(self) -> list:
+        # tags used to be embedded in the guild document, move any that are still there to their own collection
+        guild = Guild._get_collection().find_one({'_id': self.settings.guild_id}, {'tags': 1})
+        if guild is not None and guild.get('tags'):
+            ops = []
+            for tag in guild['tags']:
+                tag = dict(tag)
+                name = tag.pop('name')
+                ops.append(UpdateOne({'name': name}, {'$setOnInsert': tag}, upsert=True))
+            Tag._get_collection().bulk_write(ops, ordered=False)
+            Guild._get_collection().update_one({'_id': self.settings.guild_id}, {'$set': {'tags': []}})
+            print(f"Moved {len(ops)} tags to their own collection")
+
+        return list(Tag.objects)
+
+    async def load(self) -> None:
+        """Read every tag from the database.
+        """
+
+        tags = await self.settings.run(self._load)
+        self.tags = {tag.name: tag for tag in tags}
+        self.index = TagIndex(self.tags)
+        for name, count in self.pending.items():
+            if name in self.tags:
+                self.tags[name].use_count += count
+        self.loaded = True
+
+    async def all(self) -> list:
+        """Returns every tag, sorted by name.
+        """
+
+        if not self.loaded:
+            await self.load()
+        return [self.tags[name] for name in self.index.names]
+
+    async def search(self, query: str, limit: int = 10) -> list:
+        """Tags whose name starts with or looks like `query`. Doesn't count as a use.
+        """
+
+        if not self.loaded:
+            await self.load()
+        return [self.tags[name] for name in self.index.search(query, limit)]
+
+    async def suggest(self, name: str, limit: int = 3) -> list:
+        """Names of tags that look like `name`, for when there is no tag called `name`.
+        """
+
+        if not self.loaded:
+            await self.load()
+        return self.index.similar(name, limit)
+
+    async def get(self, name: str) -> Tag:
+        """Look up a tag by name and count a use of it.
+
+        Parameters
+        ----------
+        name : str
+            Name of the tag
+
+        Returns
+        -------
+        Tag
+            The tag, or None if there is no tag with that name
+        """
+
+        if not self.loaded:
+            await self.load()
+
+        tag = self.tags.get(name)
+        if tag is not None:
+            tag.use_count += 1
+            self.pending[name] = self.pending.get(name, 0) + 1
+        return tag
+
+    async def add(self, tag: Tag) -> None:
+        """Store a new tag.
+        """
+
+        await self.settings.save(tag)
+        self.tags[tag.name] = tag
+        self.index.add(tag.name)
+
+    async def remove(self, name: str) -> int:
+        """Delete a tag by name.
+
+        Returns
+        -------
+        int
+            Number of tags deleted
+        """
+
+        res = await self.settings.run(Tag.objects(name=name).delete)
+        self.tags.pop(name, None)
+        self.index.remove(name)
+        self.pending.pop(name, None)
+        return res
+
+    def _write(self, pending: dict) -> None:
+        ops = [UpdateOne({'name': name}, {'$inc': {'use_count': count}}) for name, count in pending.items()]
+        Tag._get_collection().bulk_write(ops, ordered=False)
+
+    async def flush(self) -> None:
+        """Write the uses counted since the last flush to the database in one bulk_write.
+        """
+
+        pending, self.pending = self.pending, {}
+        if pending:
+            await self.settings.run(self._write, pending)
+
+    def stop(self) -> None:
+        """Stop the flush loop, writing whatever is still pending. Like `XpBuffer.stop`, the write
+        doesn't go through the database thread pool since it's about to be shut down.
+        """
+
+        self.flusher.cancel()
+        pending, self.pending = self.pending, {}
+        if pending:
+            self._write(pending)
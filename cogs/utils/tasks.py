@@ -1,51 +1,180 @@
-import logging
-from datetime import datetime
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import time
+import traceback
+from datetime import datetime, timedelta
 
 import discord
+import pytz
 import random
-from apscheduler.executors.pool import ThreadPoolExecutor
-from apscheduler.jobstores.mongodb import MongoDBJobStore
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from cogs.utils.logs import prepare_unmute_log
-from data.case import Case
-
-jobstores = {
-    'default': MongoDBJobStore(database="botty", collection="jobs", host="127.0.0.1"),
-}
-
-executors = {
-    'default': ThreadPoolExecutor(20)
-}
-
-job_defaults = {
-    # 'coalesce': True
-}
+from cogs.utils.logs import prepare_bulk_unmute_log, prepare_unmute_log
 
 bot_global = None
 
 
 class Tasks():
-    """Job scheduler for unmute, using APScheduler
+    """Job scheduler for unmutes, birthday roles and giveaways. Jobs are kept in a heap ordered by
+    when they are due, and one asyncio task sleeps until the earliest one, so the cost of a tick only
+    depends on the jobs that are due. Every change is appended to a log file (BOTTY_JOBS_FILE,
+    jobs.jsonl by default), which is replayed on startup so that jobs survive restarts.
     """
 
-    def __init__(self, bot: discord.Client):
-        """Initialize scheduler
+    def __init__(self, bot: discord.Client, path: str = None, tick: float = 5):
+        """Initialize scheduler, replaying the jobs in the log
 
         Parameters
         ----------
         bot : discord.Client
             instance of Discord client
+        path : str, optional
+            Path of the job log, by default BOTTY_JOBS_FILE or jobs.jsonl
+        tick : float, optional
+            Jobs due within this many seconds of each other run together, so they can run up to this late, by default 5
         """
 
         global bot_global
         bot_global = bot
 
-        logging.basicConfig()
-        logging.getLogger('apscheduler').setLevel(logging.DEBUG)
+        self.bot = bot
+        self.path = path or os.environ.get("BOTTY_JOBS_FILE", "jobs.jsonl")
+        self.tick = tick
+        # job ID -> (timestamp when it's due, callback name, args)
+        self.jobs = {}
+        # (timestamp, sequence number, job ID), may contain jobs that were cancelled since
+        self.heap = []
+        self.counter = itertools.count()
+        self.wakeup = asyncio.Event()
+
+        # no log yet means the jobs from before can't be restored from it
+        self.fresh = not os.path.exists(self.path)
+        if not self.fresh:
+            self.replay()
+        self.compact()
+
+        self.runner = bot.loop.create_task(self.run())
+
+    def replay(self) -> None:
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a line cut short by a crash
+                    continue
+                if record["op"] == "add":
+                    self.jobs[record["id"]] = (record["at"], record["func"], record["args"])
+                else:
+                    self.jobs.pop(record["id"], None)
+
+        self.heap = [(at, next(self.counter), job_id) for job_id, (at, _, _) in self.jobs.items()]
+        heapq.heapify(self.heap)
+
+    def compact(self) -> None:
+        """Rewrite the log so it only holds the jobs that are still pending.
+        """
+
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            for job_id, (at, func, args) in self.jobs.items():
+                f.write(json.dumps({"op": "add", "id": job_id, "at": at, "func": func, "args": args}) + "\n")
+        os.replace(tmp, self.path)
+
+        self.log = open(self.path, "a")
+        self.log_lines = len(self.jobs)
+
+    def write(self, record: dict) -> None:
+        self.log.write(json.dumps(record) + "\n")
+        self.log.flush()
+        self.log_lines += 1
+        if self.log_lines > 1000 and self.log_lines > 4 * len(self.jobs):
+            self.log.close()
+            self.compact()
+
+    def stop(self) -> None:
+        """Stop running jobs and close the log. Pending jobs stay in the log for the next start.
+        """
+
+        self.runner.cancel()
+        self.log.close()
+
+    def add_job(self, job_id: str, func: str, date: datetime, args: list) -> None:
+        """Schedule a job. Raises ValueError if a job with this ID is already scheduled.
 
-        self.tasks = AsyncIOScheduler(
-            jobstores=jobstores, executors=executors, job_defaults=job_defaults, event_loop=bot.loop)
-        self.tasks.start()
+        Parameters
+        ----------
+        job_id : str
+            ID of the job, namespaced by what it does (i.e "unmute:<user ID>")
+        func : str
+            Name of the callback in `callbacks`
+        date : datetime
+            When to run the job
+        args : list
+            Arguments for the callback, must be JSON serializable
+        """
+
+        if job_id in self.jobs:
+            raise ValueError(f"Job {job_id} is already scheduled")
+
+        at = date.timestamp()
+        self.jobs[job_id] = (at, func, args)
+        self.write({"op": "add", "id": job_id, "at": at, "func": func, "args": args})
+        heapq.heappush(self.heap, (at, next(self.counter), job_id))
+        if self.heap[0][2] == job_id:
+            self.wakeup.set()
+
+    def remove_job(self, job_id: str) -> None:
+        """Cancel a job. Raises KeyError if there is no job with this ID.
+        """
+
+        del self.jobs[job_id]
+        self.write({"op": "remove", "id": job_id})
+        # cancelled jobs are skipped when they come up, but don't let them pile up
+        if len(self.heap) > 64 and len(self.heap) > 2 * len(self.jobs):
+            self.heap = [entry for entry in self.heap if self.jobs.get(entry[2], (None,))[0] == entry[0]]
+            heapq.heapify(self.heap)
+
+    async def run(self) -> None:
+        while True:
+            self.wakeup.clear()
+            now = time.time()
+            # callback name -> args of every job for it that is due
+            due = {}
+            while self.heap and self.heap[0][0] <= now:
+                at, _, job_id = heapq.heappop(self.heap)
+                job = self.jobs.get(job_id)
+                if job is None or job[0] != at:
+                    continue
+                self.remove_job(job_id)
+                due.setdefault(job[1], []).append(job[2])
+
+            for func, args in due.items():
+                if func in batch_callbacks:
+                    self.bot.loop.create_task(self.execute_batch(func, args))
+                else:
+                    for job_args in args:
+                        self.bot.loop.create_task(self.execute(func, job_args))
+
+            # wait a tick past the next job, so that jobs due around the same time run together
+            timeout = self.heap[0][0] + self.tick - now if self.heap else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def execute(self, func: str, args: list) -> None:
+        try:
+            await callbacks[func](*args)
+        except Exception:
+            traceback.print_exc()
+
+    async def execute_batch(self, func: str, args: list) -> None:
+        try:
+            await batch_callbacks[func](args)
+        except Exception:
+            traceback.print_exc()
 
     def schedule_unmute(self, id: int, date: datetime) -> None:
         """Create a task to unmute user given by ID `id`, at time `date`
@@ -58,8 +187,7 @@ class Tasks():
             When to unmute
         """
 
-        self.tasks.add_job(unmute_callback, 'date', id=str(
-            id), next_run_time=date, args=[id], misfire_grace_time=3600)
+        self.add_job(f"unmute:{id}", "unmute", date, [id])
 
     def schedule_remove_bday(self, id: int, date: datetime) -> None:
         """Create a task to remove birthday role from user given by ID `id`, at time `date`
@@ -72,8 +200,7 @@ class Tasks():
             When to remove role
         """
 
-        self.tasks.add_job(remove_bday_callback, 'date', id=str(
-            id+1), next_run_time=date, args=[id], misfire_grace_time=3600)
+        self.add_job(f"bday:{id}", "remove_bday", date, [id])
 
     def cancel_unmute(self, id: int) -> None:
         """When we manually unmute a user given by ID `id`, stop the task to unmute them.
@@ -84,7 +211,7 @@ class Tasks():
             User whose unmute task we want to cancel
         """
 
-        self.tasks.remove_job(str(id), 'default')
+        self.remove_job(f"unmute:{id}")
 
     def cancel_unbirthday(self, id: int) -> None:
         """When we manually unset the birthday of a user given by ID `id`, stop the task to remove the role.
@@ -93,7 +220,7 @@ class Tasks():
         id : int
             User whose task we want to cancel
         """
-        self.tasks.remove_job(str(id+1), 'default')
+        self.remove_job(f"bday:{id}")
         
     def schedule_end_giveaway(self, channel_id: int, message_id: int, date: datetime, winners: int) -> None:
         """
@@ -109,91 +236,137 @@ class Tasks():
             When to end the giveaway
         """
 
-        self.tasks.add_job(end_giveaway_callback, 'date', id=str(message_id+2), next_run_time=date, args=[channel_id, message_id, winners], misfire_grace_time=3600)
+        self.add_job(f"giveaway:{message_id}", "end_giveaway", date, [channel_id, message_id, winners])
 
-def unmute_callback(id: int) -> None:
-    """Callback function for actually unmuting. Creates asyncio task
-    to do the actual unmute.
+    def schedule_birthdays(self, date: datetime) -> None:
+        """Create the task that gives out birthday roles, at time `date`. It schedules itself again
+        for the next day when it runs.
 
-    Parameters
-    ----------
-    id : int
-        User who we want to unmute
+        Parameters
+        ----------
+        date : datetime.datetime
+            When to give out the roles
+        """
+
+        self.add_job("birthdays", "give_birthdays", date, [])
+
+    def cancel_end_giveaway(self, message_id: int) -> None:
+        """When a giveaway is ended early, stop the task to end it.
+
+        Parameters
+        ----------
+        message_id : int
+            Giveaway message ID
+        """
+
+        self.remove_job(f"giveaway:{message_id}")
+
+async def limited(semaphore: asyncio.Semaphore, coro) -> None:
+    """Run a call to Discord while holding `semaphore`, so that a batch doesn't fire all of its
+    requests at once. Failed requests are ignored.
     """
 
-    bot_global.loop.create_task(remove_mute(id))
+    async with semaphore:
+        try:
+            await coro
+        except discord.HTTPException:
+            pass
 
 
-async def remove_mute(id: int) -> None:
-    """Remove the mute role of the user given by ID `id`
+async def remove_mutes(args: list) -> None:
+    """Unmute every user whose temporary mute expired in the same tick. The guild settings are read once,
+    case IDs are reserved at once, the cases and is_muted flags are written in one go each, and one
+    log goes to the public channel for the whole batch. Calls to Discord are limited to a few at a time.
 
     Parameters
     ----------
-    id : int
-        User to unmute
+    args : list
+        Arguments of each unmute job, which are [user ID]
     """
 
-    guild = bot_global.get_guild(bot_global.settings.guild_id)
-    if guild is not None:
-        mute_role = bot_global.settings.guild().role_mute
-        mute_role = guild.get_role(mute_role)
-        if mute_role is not None:
-            user = guild.get_member(id)
-            if user is not None:
-                await user.remove_roles(mute_role)
-                case = Case(
-                    _id=bot_global.settings.guild().case_id,
-                    _type="UNMUTE",
-                    mod_id=bot_global.user.id,
-                    mod_tag=str(bot_global.user),
-                    reason="Temporary mute expired.",
-                )
-                await bot_global.settings.inc_caseid()
-                await bot_global.settings.add_case(user.id, case)
-
-                u = await bot_global.settings.user(id=user.id)
-                u.is_muted = False
-                u.save()
-
-                log = await prepare_unmute_log(bot_global.user, user, case)
-
-                log.remove_author()
-                log.set_thumbnail(url=user.avatar_url)
-
-                public_chan = guild.get_channel(
-                    bot_global.settings.guild().channel_public)
-                try:
-                    await public_chan.send(embed=log)
-                    await user.send(embed=log)
-                except Exception:
-                    pass
-            else:
-                case = Case(
-                    _id=bot_global.settings.guild().case_id,
-                    _type="UNMUTE",
-                    mod_id=bot_global.user.id,
-                    mod_tag=str(bot_global.user),
-                    reason="Temporary mute expired.",
-                )
-                await bot_global.settings.inc_caseid()
-                await bot_global.settings.add_case(id, case)
-
-                u = await bot_global.settings.user(id=id)
-                u.is_muted = False
-                u.save()
-
-
-def remove_bday_callback(id: int) -> None:
-    """Callback function for actually unmuting. Creates asyncio task
-    to do the actual unmute.
+    ids = [job_args[0] for job_args in args]
+    settings = bot_global.settings
+    db_guild = settings.guild()
 
-    Parameters
-    ----------
-    id : int
-        User who we want to unmute
+    guild = bot_global.get_guild(settings.guild_id)
+    if guild is None:
+        return
+    mute_role = guild.get_role(db_guild.role_mute)
+    if mute_role is None:
+        return
+
+    members = [member for member in map(guild.get_member, ids) if member is not None]
+    semaphore = asyncio.Semaphore(5)
+
+    await asyncio.gather(*[limited(semaphore, member.remove_roles(mute_role)) for member in members])
+
+    reason = "Temporary mute expired."
+    cases = await settings.create_cases(
+        ids,
+        _type="UNMUTE",
+        mod_id=bot_global.user.id,
+        mod_tag=str(bot_global.user),
+        reason=reason,
+    )
+    await settings.set_muted(ids, False)
+
+    if not members:
+        return
+
+    case_of = dict(zip(ids, cases))
+    public_chan = guild.get_channel(db_guild.channel_public)
+    dms = []
+    for member in members:
+        log = await prepare_unmute_log(bot_global.user, member, case_of[member.id])
+        log.remove_author()
+        log.set_thumbnail(url=member.avatar_url)
+        dms.append(limited(semaphore, member.send(embed=log)))
+
+    if public_chan is not None:
+        if len(members) == 1:
+            public_logs = [log]
+        else:
+            public_logs = await prepare_bulk_unmute_log(bot_global.user, [(member, case_of[member.id]) for member in members], reason)
+        for public_log in public_logs:
+            await limited(semaphore, public_chan.send(embed=public_log))
+
+    await asyncio.gather(*dms)
+
+
+async def give_birthdays() -> None:
+    """Give the birthday role to everyone whose birthday it is today, in Eastern time, and schedule
+    the role to be removed at midnight, which is also when this runs again.
     """
 
-    bot_global.loop.create_task(remove_bday(id))
+    eastern = pytz.timezone('US/Eastern')
+    now = datetime.now(eastern)
+    tomorrow = now.date() + timedelta(days=1)
+    midnight = eastern.localize(datetime(tomorrow.year, tomorrow.month, tomorrow.day))
+    settings = bot_global.settings
+
+    guild = bot_global.get_guild(settings.guild_id)
+    birthday_role = guild.get_role(settings.guild().role_birthday) if guild is not None else None
+    if birthday_role is None:
+        # the guild isn't available yet or the role isn't set up, try again in a bit instead of skipping the day
+        settings.tasks.schedule_birthdays(datetime.now() + timedelta(minutes=15))
+        return
+    settings.tasks.schedule_birthdays(midnight)
+
+    ids = await settings.retrieve_birthdays([now.month, now.day])
+    members = []
+    for member in map(guild.get_member, ids):
+        if member is None or birthday_role in member.roles:
+            continue
+        try:
+            settings.tasks.schedule_remove_bday(member.id, midnight)
+        except ValueError:
+            continue
+        members.append(member)
+
+    semaphore = asyncio.Semaphore(5)
+    await asyncio.gather(*[limited(semaphore, member.add_roles(birthday_role)) for member in members])
+    await asyncio.gather(*[limited(semaphore, member.send(f"According to my calculations, today is your birthday! We've given you the {birthday_role} role for 24 hours."))
+                           for member in members])
 
 
 async def remove_bday(id: int) -> None:
@@ -217,20 +390,6 @@ async def remove_bday(id: int) -> None:
     user = guild.get_member(id)
     await user.remove_roles(bday_role)
 
-def end_giveaway_callback(channel_id: int, message_id: int, winners: int) -> None:
-    """
-    Callback function for ending a giveaway
-
-    Parameters
-    ----------
-    channel_id : int
-        ID of the channel that the giveaway is in
-    message_id : int
-        Message ID of the giveaway
-    """
-
-    bot_global.loop.create_task(end_giveaway(channel_id, message_id, winners))
-
 async def end_giveaway(channel_id: int, message_id: int, winners: int) -> None:
     """
     End a giveaway.
@@ -282,3 +441,16 @@ async def end_giveaway(channel_id: int, message_id: int, winners: int) -> None:
         await channel.send(f"Congratulations {mentions[0]}! You won the giveaway of **{embed.title}**!")
     else:
         await channel.send(f"Congratulations {', '.join(mentions)}! You won the giveaway of **{embed.title}**!")
+
+
+# callbacks jobs can run, by the name stored in the job log
+callbacks = {
+    "give_birthdays": give_birthdays,
+    "remove_bday": remove_bday,
+    "end_giveaway": end_giveaway,
+}
+
+# callbacks that get the arguments of every job of theirs that is due in the same tick at once
+batch_callbacks = {
+    "unmute": remove_mutes,
+}
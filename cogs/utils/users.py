@@ -0,0 +1,86 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import discord
+
+
+class UserCache:
+    """Bounded cache of user profiles fetched from the Discord API, shared by every cog that
+    needs to look up users who aren't in the guild. Entries expire after `ttl` seconds and the
+    least recently used ones are dropped once there are more than `maxsize`.
+    """
+
+    def __init__(self, bot: discord.Client, maxsize: int = 2000, ttl: float = 3600, concurrency: int = 5):
+        """Initialize the cache.
+
+        Parameters
+        ----------
+        bot : discord.Client
+            Instance of Discord client used to fetch users
+        maxsize : int, optional
+            Maximum number of users to keep, by default 2000
+        ttl : float, optional
+            How long to keep a user for, in seconds, by default 3600
+        concurrency : int, optional
+            Maximum number of fetches running at once, by default 5
+        """
+
+        self.bot = bot
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.semaphore = asyncio.Semaphore(concurrency)
+        # user ID -> (discord.User or None if the user doesn't exist, when the entry expires)
+        self.cache = OrderedDict()
+
+    async def fetch(self, id: int):
+        """Look up a user by ID.
+
+        Parameters
+        ----------
+        id : int
+            ID of the user
+
+        Returns
+        -------
+        discord.User
+            The user, or None if no user with that ID exists
+        """
+
+        now = time.monotonic()
+        cached = self.cache.get(id)
+        if cached is not None and cached[1] > now:
+            self.cache.move_to_end(id)
+            return cached[0]
+
+        user = self.bot.get_user(id)
+        if user is None:
+            async with self.semaphore:
+                try:
+                    user = await self.bot.fetch_user(id)
+                except discord.NotFound:
+                    user = None
+
+        self.cache[id] = (user, now + self.ttl)
+        self.cache.move_to_end(id)
+        while len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+        return user
+
+    async def fetch_many(self, ids) -> dict:
+        """Look up several users at once, with at most `concurrency` requests in flight.
+
+        Parameters
+        ----------
+        ids : iterable
+            IDs of the users
+
+        Returns
+        -------
+        dict
+            user ID -> discord.User, or None if the user doesn't exist or couldn't be fetched
+        """
+
+        ids = list(dict.fromkeys(ids))
+        results = await asyncio.gather(*[self.fetch(id) for id in ids], return_exceptions=True)
+        return {id: (None if isinstance(res, Exception) else res) for id, res in zip(ids, results)}
@@ -0,0 +1,78 @@
+from collections import deque
+
+
+class WordMatcher:
+    """Aho-Corasick automaton over the filtered words, so that a message can be checked
+    against every word in a single pass over the text instead of one substring search per word.
+    Words are matched lowercased, same as the old `word.word.lower() in message` check.
+    """
+
+    def __init__(self, words: list):
+        """Build the automaton.
+
+        Parameters
+        ----------
+        words : list
+            List of FilterWord documents to match
+        """
+
+        self.words = list(words)
+        # trie edges, failure links and the indexes of the words that end at each node
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+
+        for i, word in enumerate(self.words):
+            node = 0
+            for ch in word.word.lower():
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[node][ch] = nxt
+                node = nxt
+            self.out[node].append(i)
+
+        # breadth first so that a node's failure link is always computed before its children's
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def search(self, text: str) -> set:
+        """Find all the words that appear in `text`.
+
+        Parameters
+        ----------
+        text : str
+            Text to search, should already be lowercased
+
+        Returns
+        -------
+        set
+            Indexes into `self.words` of every word found
+        """
+
+        found = set(self.out[0])
+        node = 0
+        for ch in text:
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            if self.out[node]:
+                found.update(self.out[node])
+        return found
+
+    def matched(self, found: set) -> list:
+        """Turn the result of `search` back into FilterWords, in the order they were added to the filter.
+        """
+
+        return [self.words[i] for i in sorted(found)]
@@ -0,0 +1,102 @@
+from discord.ext import tasks
+from pymongo import UpdateOne
+
+from data.user import User
+
+
+class XpBuffer:
+    """Write-behind buffer for XP gains. The first message from a user in a window is written
+    straight to the database so that we know their real totals, every message after that only
+    adds to a pending counter. All the pending counters are written with one bulk_write every
+    `interval` seconds.
+    """
+
+    def __init__(self, settings, interval: float):
+        """Initialize the buffer and start the flush loop.
+
+        Parameters
+        ----------
+        settings : Settings
+            State of the bot, used to run queries on the database thread pool
+        interval : float
+            How often to flush pending XP to the database, in seconds
+        """
+
+        self.settings = settings
+        # user ID -> XP gained since the last flush
+        self.pending = {}
+        # user ID -> [xp, level] including pending XP, or None if the user's XP is frozen
+        self.totals = {}
+        self.flusher = tasks.loop(seconds=interval)(self.flush)
+        self.flusher.start()
+
+    async def add(self, id: int, xp: int):
+        """Add XP to a user.
+
+        Parameters
+        ----------
+        id : int
+            The user's ID
+        xp : int
+            Amount of XP to add
+
+        Returns
+        -------
+        tuple
+            (xp, level) of the user after adding, or None if their XP is frozen
+        """
+
+        if id not in self.totals:
+            res = await self.settings.run(self.settings._inc_xp, id, xp)
+            # another message from this user might have been written through while we were waiting
+            current = self.totals.get(id)
+            if res is None or current is None or res[0] >= current[0]:
+                self.totals[id] = list(res) if res is not None else None
+            return res
+
+        if self.totals[id] is None:
+            return None
+
+        self.pending[id] = self.pending.get(id, 0) + xp
+        self.totals[id][0] += xp
+        return tuple(self.totals[id])
+
+    def level_up(self, id: int) -> None:
+        """Keep our copy of the user's level in sync after `Settings.inc_level`.
+        """
+
+        if self.totals.get(id) is not None:
+            self.totals[id][1] += 1
+
+    def forget(self, id: int) -> None:
+        """Drop our copy of a user's totals, i.e when their XP is changed or frozen by a command.
+        Pending XP is still written on the next flush.
+        """
+
+        self.totals.pop(id, None)
+
+    def _write(self, pending: dict) -> None:
+        ops = [UpdateOne({'_id': id, 'is_xp_frozen': {'$ne': True}, 'is_clem': {'$ne': True}}, {'$inc': {'xp': xp}})
+               for id, xp in pending.items()]
+        User._get_collection().bulk_write(ops, ordered=False)
+
+    async def flush(self) -> None:
+        """Write all the pending XP to the database in one bulk_write.
+        """
+
+        pending, self.pending = self.pending, {}
+        if pending:
+            await self.settings.run(self._write, pending)
+
+        # users who sent a message while we were writing still need their totals for the next flush
+        self.totals = {id: total for id, total in self.totals.items() if id in self.pending}
+
+    def stop(self) -> None:
+        """Stop the flush loop, writing whatever is still pending. The write is done right here
+        rather than on the database thread pool, because Settings shuts the pool down right after.
+        """
+
+        self.flusher.cancel()
+        pending, self.pending = self.pending, {}
+        if pending:
+            self._write(pending)
@@ -0,0 +1,43 @@
+import mongoengine
+import datetime
+from data.case import Case
+
+class CaseRecord(mongoengine.Document):
+    user_id           = mongoengine.IntField(required=True)
+    case_id           = mongoengine.IntField(required=True)
+    _type             = mongoengine.StringField(required=True)
+    date              = mongoengine.DateTimeField(default=datetime.datetime.now, required=True)
+    until             = mongoengine.DateTimeField(default=None)
+    mod_id            = mongoengine.IntField(required=True)
+    mod_tag           = mongoengine.StringField(required=True)
+    reason            = mongoengine.StringField(required=True)
+    punishment        = mongoengine.StringField()
+    lifted            = mongoengine.BooleanField(default=False)
+    lifted_by_tag     = mongoengine.StringField()
+    lifted_by_id      = mongoengine.IntField()
+    lifted_reason     = mongoengine.StringField()
+    lifted_date       = mongoengine.DateField()
+
+    meta = {
+        'db_alias': 'core',
+        'collection': 'case_records',
+        'indexes': [
+            {'fields': ['user_id', '-date', '-case_id']},
+            {'fields': ['case_id']},
+        ]
+    }
+
+    @classmethod
+    def from_case(cls, user_id: int, case: Case) -> 'CaseRecord':
+        """Make a record out of a Case belonging to the user with ID `user_id`
+        """
+
+        fields = {name: case[name] for name in Case._fields if name != '_id'}
+        return cls(user_id=user_id, case_id=case._id, **fields)
+
+    def to_case(self) -> Case:
+        """The Case this record holds, which is what the rest of the bot works with
+        """
+
+        fields = {name: self[name] for name in Case._fields if name != '_id'}
+        return Case(_id=self.case_id, **fields)
@@ -2,6 +2,7 @@ import mongoengine
 from data.case import Case
 
 class Cases(mongoengine.Document):
+    # legacy storage, cases are now stored as CaseRecord documents. Settings.migrate_cases moves them over on startup
     _id   = mongoengine.IntField(required=True)
     cases = mongoengine.EmbeddedDocumentListField(Case, default=[])
     meta = {
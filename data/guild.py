@@ -1,6 +1,5 @@
 import mongoengine
 from data.filterword import FilterWord
-from data.tag import Tag
 
 class Guild(mongoengine.Document):
     _id                       = mongoengine.IntField(required=True)
@@ -36,7 +35,8 @@ class Guild(mongoengine.Document):
     logging_excluded_channels = mongoengine.ListField(default=[])
     nsa_guild_id              = mongoengine.IntField()
     nsa_mapping               = mongoengine.DictField(default={})
-    tags                      = mongoengine.EmbeddedDocumentListField(Tag, default=[])
+    # legacy, tags are now stored in their own collection. TagStore.load moves them over on startup
+    tags                      = mongoengine.ListField(default=[])
 
     meta = {
         'db_alias': 'core',
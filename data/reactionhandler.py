@@ -0,0 +1,13 @@
+import mongoengine
+
+class ReactionHandler(mongoengine.Document):
+    _id        = mongoengine.IntField(required=True)
+    channel_id = mongoengine.IntField(required=True)
+    kind       = mongoengine.StringField(required=True)
+    data       = mongoengine.DictField(default={})
+    expires    = mongoengine.DateTimeField(default=None)
+
+    meta = {
+        'db_alias': 'core',
+        'collection': 'reaction_handlers'
+    }
@@ -1,11 +1,15 @@
 import mongoengine
 from datetime import datetime
 
-class Tag(mongoengine.EmbeddedDocument):
-    name         = mongoengine.StringField(required=True)
+class Tag(mongoengine.Document):
+    name         = mongoengine.StringField(required=True, unique=True)
     content      = mongoengine.StringField(required=True)
     added_by_tag = mongoengine.StringField()
     added_by_id  = mongoengine.IntField()
     added_date   = mongoengine.DateTimeField(default=datetime.now)
     use_count    = mongoengine.IntField(default=0)
- 
\ No newline at end of file
+
+    meta = {
+        'db_alias': 'core',
+        'collection': 'tags'
+    }
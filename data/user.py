@@ -19,5 +19,10 @@ class User(mongoengine.Document):
 
     meta = {
         'db_alias': 'core',
-        'collection': 'users'
+        'collection': 'users',
+        'indexes': [
+            {'fields': ['xp', '_id']},
+            # birthday is [month, day]
+            {'fields': ['birthday.0', 'birthday.1']},
+        ]
     }
\ No newline at end of file
@@ -0,0 +1,38 @@
+import datetime
+
+import mongoengine
+import pytest
+
+# runs against an in-memory database
+pytest.importorskip("mongomock")
+
+from cogs.utils.settings import Settings
+from data.case import Case
+from data.caserecord import CaseRecord
+from data.cases import Cases
+
+
+@pytest.fixture
+def db():
+    mongoengine.connect("botty-test", host="mongomock://localhost", alias="core")
+    yield
+    mongoengine.disconnect(alias="core")
+
+
+def test_migrate_cases_moves_legacy_cases_once(db):
+    cases = [
+        Case(_id=1, _type="WARN", date=datetime.datetime(2020, 1, 1), mod_id=2, mod_tag="mod#0001", reason="spam", punishment="50"),
+        Case(_id=2, _type="MUTE", date=datetime.datetime(2020, 1, 2), mod_id=2, mod_tag="mod#0001", reason="spam", punishment="1 hour"),
+    ]
+    Cases(_id=123, cases=cases).save()
+    Cases(_id=456, cases=[]).save()
+
+    # migrate_cases doesn't use any state of the cog
+    assert Settings.migrate_cases(None) == 2
+    # QuerySet.count() doesn't work with mongomock on this version of mongoengine, so count on the collection
+    assert Cases._get_collection().count_documents({}) == 0
+    records = CaseRecord.objects(user_id=123).order_by('case_id')
+    assert [(r.case_id, r._type) for r in records] == [(1, "WARN"), (2, "MUTE")]
+
+    assert Settings.migrate_cases(None) == 0
+    assert CaseRecord._get_collection().count_documents({}) == 2